@@ -0,0 +1,187 @@
+import json
+import hashlib
+import argparse
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+import pandas as pd
+import pyarrow as pa
+from config import Config
+from data_manager import DataManager
+from shot_analyzer import ShotAnalyzer
+from disk_cache import db_version
+
+ARROW_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class QueryAPI:
+    """Read-only query API over session and shot data.
+
+    Requests are normalized to the path and the parameters actually used.
+    Responses are tagged with an ETag derived from the database version, so a
+    poll with a matching If-None-Match is answered without touching the data,
+    and rendered bodies are kept in a bounded in-process LRU cache that is
+    cleared whenever the database version changes.
+    """
+
+    MAX_CACHE_ENTRIES = 256
+    DEFAULT_HISTORY_METRICS = ('piq_score', 'max_piq_score')
+
+    SESSION_COLUMNS = ['_id', 'local_id', 'datetime', 'type', 'total_shot_count', 'piq_score',
+                       'max_piq_score', 'activity_level', 'rate', 'best_rally',
+                       'max_serve_speed', 'max_forehand_speed', 'max_backhand_speed',
+                       'forehand_avg_score', 'backhand_avg_score', 'serve_avg_score']
+
+    def __init__(self, config: Config):
+        self.config = config
+        self._cache: OrderedDict = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    def request_key(self, path: str, params: Dict, fmt: str) -> Tuple:
+        """Normalize a request to (path parts, used parameters, format)"""
+        parts = tuple(p for p in path.split('/') if p)
+        metrics = ()
+        if parts == ('history',):
+            metrics = tuple(m.strip() for m in ','.join(params.get('metric', [])).split(',') if m.strip())
+            metrics = metrics or self.DEFAULT_HISTORY_METRICS
+        return parts, metrics, fmt
+
+    @staticmethod
+    def etag(version: str, key: Tuple) -> str:
+        digest = hashlib.sha256(f"{version}|{key!r}".encode())
+        return f'"{digest.hexdigest()[:32]}"'
+
+    def respond(self, key: Tuple, version: str) -> Tuple[bytes, str]:
+        """Return (body, content type) for a normalized request at a database version"""
+        with self._lock:
+            if version != self._version:
+                self._cache.clear()
+                self._version = version
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        parts, metrics, fmt = key
+        body = self._encode(self._query(parts, metrics), fmt)
+        with self._lock:
+            if self._version == version:
+                self._cache[key] = body
+                while len(self._cache) > self.MAX_CACHE_ENTRIES:
+                    self._cache.popitem(last=False)
+        return body
+
+    def _query(self, parts: Tuple[str, ...], metrics: Tuple[str, ...]) -> pd.DataFrame:
+        if parts == ('sessions',):
+            return self.sessions()
+        if len(parts) == 3 and parts[0] == 'sessions' and parts[2] == 'shots':
+            return self.shot_stats(parts[1])
+        if parts == ('history',):
+            return self.history(list(metrics))
+        raise ApiError(404, f"Unknown resource: /{'/'.join(parts)}")
+
+    def sessions(self) -> pd.DataFrame:
+        df = DataManager.load_sessions(self.config)
+        return df[[c for c in self.SESSION_COLUMNS if c in df.columns]]
+
+    def shot_stats(self, session_id: str) -> pd.DataFrame:
+        """Per-stroke shot statistics for one session"""
+        sessions = DataManager.load_sessions(self.config)
+        match = sessions[sessions['_id'].astype(str) == session_id]
+        if match.empty:
+            raise ApiError(404, f"Unknown session: {session_id}")
+        session = match.iloc[0]
+
+        df = ShotAnalyzer.load_shot_data(self.config, match['_id'].iloc[0], session['datetime'], session['local_id'])
+        stats = df.groupby('stroke_category')[ShotAnalyzer.source_metrics(self.config)].agg(
+            ['count', 'mean', 'median', 'std', 'min', 'max'])
+        stats.columns = [f"{metric}_{stat}" for metric, stat in stats.columns]
+        return stats.reset_index()
+
+    def history(self, metrics) -> pd.DataFrame:
+        """Session metrics over time, oldest first"""
+        df = DataManager.load_sessions(self.config)
+        unknown = [m for m in metrics if m not in df.columns or not pd.api.types.is_numeric_dtype(df[m])]
+        if unknown:
+            raise ApiError(400, f"Unknown metric(s): {', '.join(unknown)}")
+        return df[['_id', 'datetime'] + metrics].sort_values('datetime')
+
+    @staticmethod
+    def _encode(df: pd.DataFrame, fmt: str) -> Tuple[bytes, str]:
+        if fmt == 'arrow':
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, table.schema) as writer:
+                writer.write_table(table)
+            return sink.getvalue().to_pybytes(), ARROW_CONTENT_TYPE
+        body = df.to_json(orient='records', date_format='iso')
+        return body.encode(), 'application/json'
+
+
+def make_handler(api: QueryAPI):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+            wants_arrow = (params.get('format') == ['arrow']
+                           or ARROW_CONTENT_TYPE in self.headers.get('Accept', ''))
+            fmt = 'arrow' if wants_arrow else 'json'
+
+            # One version snapshot for both the ETag and the body
+            version = db_version(api.config)
+            key = api.request_key(url.path, params, fmt)
+            etag = api.etag(version, key)
+            if etag in self.headers.get('If-None-Match', ''):
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            try:
+                body, content_type = api.respond(key, version)
+            except ApiError as e:
+                self._send_error(e.status, str(e))
+                return
+            except Exception as e:
+                self._send_error(500, f"{type(e).__name__}: {e}")
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_error(self, status: int, message: str):
+            body = json.dumps({'error': message}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only query API for tennis session data")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(QueryAPI(Config())))
+    print(f"Serving on http://{args.host}:{args.port}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
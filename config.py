@@ -1,5 +1,5 @@
-from dataclasses import dataclass
-from typing import Dict
+from dataclasses import dataclass, replace
+from typing import Dict, Optional, Tuple
 from pathlib import Path
 
 @dataclass
@@ -9,6 +9,20 @@ class Config:
     # Database paths
     DB_PATH: Path = Path('./playpop_.db')
     SHOT_DB_PATH: Path = Path('./BabPopExt.db')
+    SKETCH_DB_PATH: Path = Path('./shot_sketches.db')
+    
+    # Player registry: name -> (session DB, shot DB); defaults to the pair above.
+    # federation.discover_players builds one from a directory of databases.
+    PLAYERS: Dict[str, Tuple[Path, Path]] = None
+    FEDERATION_MAX_WORKERS: int = 8
+    
+    # Shot source: 'motions' (SHOT_DB_PATH, matched by session time window)
+    # or 'light_motions' (tb_light_motions in DB_PATH, matched by activity_id)
+    SHOT_SOURCE: str = 'motions'
+    
+    # Disk cache shared by worker processes (None disables it)
+    CACHE_DIR: Optional[Path] = Path('./.cache')
+    CACHE_MAX_BYTES: int = 512 * 1024 * 1024
     
     # Time settings
     TIMEZONE: str = 'America/Phoenix'
@@ -17,6 +31,15 @@ class Config:
     SPEED_CONVERSION_FACTOR: float = 2.25  # m/s to mph
     DEFAULT_ROLLING_WINDOW: int = 5
     MIN_SPEED_THRESHOLD: float = 50.0
+    RALLY_MAX_GAP_SECONDS: float = 8.0
+    
+    # Prefetch settings (shot analysis session browsing)
+    PREFETCH_MAX_WORKERS: int = 2
+    PREFETCH_RECENT_SESSIONS: int = 3
+    
+    # Sketch settings (per-session shot distributions)
+    SKETCH_COMPRESSION: int = 100
+    SKETCH_BIN_WIDTHS: Dict[str, float] = None
     
     # Visualization settings
     PLOT_COLORS: Dict[str, str] = None
@@ -29,3 +52,25 @@ class Config:
             'backhand': '#9b59b6',
             'serve': '#e74c3c'
         }
+        self.SKETCH_BIN_WIDTHS = {
+            'PIQ': 100.0,
+            'StyleScore': 50.0,
+            'StyleValue': 0.25,
+            'EffectScore': 50.0,
+            'EffectValue': 1.0,
+            'SpeedScore': 50.0,
+            'SpeedValue': 0.5
+        }
+        if self.PLAYERS is None:
+            self.PLAYERS = {'default': (self.DB_PATH, self.SHOT_DB_PATH)}
+    
+    def for_player(self, name: str) -> 'Config':
+        """Configuration scoped to one registered player's databases"""
+        db_path, shot_db_path = self.PLAYERS[name]
+        return replace(
+            self,
+            DB_PATH=Path(db_path),
+            SHOT_DB_PATH=Path(shot_db_path),
+            SKETCH_DB_PATH=self.SKETCH_DB_PATH.with_name(f"{self.SKETCH_DB_PATH.stem}_{name}.db"),
+            PLAYERS={name: (db_path, shot_db_path)}
+        )
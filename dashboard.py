@@ -1,11 +1,17 @@
+import uuid
 import streamlit as st
 import pandas as pd
+import plotly.express as px
 import plotly.graph_objects as go
 from typing import Optional
 from config import Config
 from shot_analyzer import ShotAnalyzer
 from visualizer import Visualizer
 from data_manager import DataManager
+from prefetcher import SessionPrefetcher
+from disk_cache import db_version
+from federation import Federation
+from rallies import load_rallies
 
 class Dashboard:
     """Main dashboard class combining session and shot analysis"""
@@ -19,6 +25,9 @@ class Dashboard:
         self.data_manager = DataManager(self.config)
         self.visualizer = Visualizer()
         self.shot_analyzer = ShotAnalyzer(self.config)
+        self.prefetcher = SessionPrefetcher.get(self.config)
+        if 'prefetch_owner' not in st.session_state:
+            st.session_state['prefetch_owner'] = uuid.uuid4().hex
 
         # Load session data
         self.sessions_df = self.data_manager.load_sessions(self.config)
@@ -33,7 +42,7 @@ class Dashboard:
         # Main view selection
         self.view_mode = st.sidebar.radio(
             "Select View",
-            ["Session Analysis", "Historical Analysis", "Shot Analysis"],
+            ["Session Analysis", "Historical Analysis", "Shot Analysis", "Session Comparison", "Team Overview"],
             key="view_mode_radio"
         )
 
@@ -42,8 +51,15 @@ class Dashboard:
             self.render_session_analysis()
         elif self.view_mode == "Historical Analysis":
             self.render_historical_analysis()
-        else:
+        elif self.view_mode == "Shot Analysis":
             self.render_shot_analysis()
+        elif self.view_mode == "Session Comparison":
+            self.render_session_comparison()
+        else:
+            self.render_team_overview()
+
+        if self.view_mode != "Shot Analysis":
+            self.prefetcher.cancel(st.session_state['prefetch_owner'])
 
     def get_session_selector(self) -> Optional[str]:
         """Get selected session ID"""
@@ -74,7 +90,85 @@ class Dashboard:
             st.markdown(f"Total Shots: {session['total_shot_count']}")
 
             # Render shot analysis
-            self.shot_analyzer.render_shot_analysis(session_id, session_datetime)
+            self.shot_analyzer.render_shot_analysis(session_id, session_datetime, session['local_id'])
+            self.prefetch_adjacent_sessions(session_id)
+
+    def prefetch_adjacent_sessions(self, session_id):
+        """Warm the shot cache for the neighbouring and recently viewed sessions"""
+        if not self.shot_analyzer.shot_source_available(self.config):
+            return
+
+        recent = [s for s in st.session_state.get('recent_sessions', []) if s != session_id]
+        st.session_state['recent_sessions'] = [session_id] + recent[:self.config.PREFETCH_RECENT_SESSIONS - 1]
+
+        session_ids = list(self.sessions_df['_id'].unique())
+        idx = session_ids.index(session_id)
+        targets = [session_ids[i] for i in (idx - 1, idx + 1) if 0 <= i < len(session_ids)]
+        targets += [s for s in recent[:self.config.PREFETCH_RECENT_SESSIONS] if s not in targets]
+
+        jobs = {}
+        for target in targets:
+            session = self.sessions_df[self.sessions_df['_id'] == target].iloc[0]
+            args = (self.config, db_version(self.config), target, session['datetime'], session['local_id'])
+            jobs[target] = lambda args=args: self.shot_analyzer.load_shot_stats(*args)
+        self.prefetcher.prefetch(st.session_state['prefetch_owner'], jobs)
+
+    def render_session_comparison(self):
+        """Render side-by-side comparison of several sessions"""
+        session_ids = st.sidebar.multiselect(
+            "Select Sessions",
+            self.sessions_df['_id'].unique(),
+            default=self.sessions_df['_id'].unique()[:2],
+            format_func=lambda x: f"ID: {x} - {self.sessions_df[self.sessions_df['_id'] == x]['formatted_time'].iloc[0]}",
+            key="comparison_selector"
+        )
+        if session_ids:
+            sessions = self.sessions_df[self.sessions_df['_id'].isin(session_ids)]
+            self.shot_analyzer.render_session_comparison(sessions)
+
+    def render_team_overview(self):
+        """Render leaderboard and history across all registered players"""
+        federation = Federation(self.config)
+        team_sessions = federation.load_sessions()
+        for player, error in federation.errors.items():
+            st.warning(f"Could not load data for {player}: {error}")
+        if team_sessions.empty:
+            st.warning("No session data found for any player.")
+            return
+
+        st.header("Leaderboard")
+        st.dataframe(federation.leaderboard(team_sessions).style.format({
+            'avg_piq': "{:.0f}",
+            'best_serve_speed': "{:.1f} mph"
+        }))
+
+        st.header("Team History")
+        metric = st.selectbox(
+            "Select metric",
+            ['piq_score', 'max_piq_score', 'activity_level', 'rate'],
+            key='team_metric'
+        )
+        st.plotly_chart(px.line(
+            team_sessions.sort_values('datetime'),
+            x='datetime',
+            y=metric,
+            color='player',
+            markers=True,
+            title=f"{metric} by Player"
+        ))
+
+        st.header("Recent Shot Quality")
+        recent_count = st.slider("Sessions per player", 1, 20, 5, key='team_recent_sessions')
+        recent = team_sessions.groupby('player', observed=True).head(recent_count)
+        shots = federation.load_shots(recent)
+        for player, error in federation.errors.items():
+            st.warning(f"Could not load shots for {player}: {error}")
+        if shots.empty:
+            st.warning("No shot data found for recent sessions.")
+            return
+        metrics = self.shot_analyzer.source_metrics(self.config)
+        stroke_stats = shots.groupby(['player', 'stroke_category'], observed=True)[metrics].mean()
+        st.dataframe(stroke_stats.style.format("{:.1f}"))
 
     def display_session_metrics(self, session: pd.Series):
         metrics = [
@@ -117,6 +211,8 @@ class Dashboard:
         self.setup_historical_controls()
         self.display_historical_trends()
         self.display_summary_statistics()
+        self.shot_analyzer.render_multi_session_distribution(self.sessions_df)
+        self.display_rally_analysis()
 
     def setup_historical_controls(self):
         st.sidebar.header("Visualization Options")
@@ -321,6 +417,62 @@ class Dashboard:
         )
         st.plotly_chart(fig)
 
+    def display_rally_analysis(self):
+        st.header("Rally Analysis")
+        if not self.shot_analyzer.shot_source_available(self.config):
+            st.warning("No shot data source found; check the shot database settings in config.py.")
+            return
+
+        rallies = load_rallies(self.config, self.config.RALLY_MAX_GAP_SECONDS)
+        if rallies.empty:
+            st.warning("No shot data found for rally analysis.")
+            return
+
+        min_length = st.slider("Minimum rally length (shots)", 1, 10, 2, key='rally_min_length')
+        rallies = rallies[rallies['length'] >= min_length]
+        if rallies.empty:
+            st.warning("No rallies match the selected length.")
+            return
+
+        cols = st.columns(3)
+        cols[0].metric("Rallies", f"{len(rallies)}")
+        cols[1].metric("Average Length", f"{rallies['length'].mean():.1f} shots", f"Longest: {rallies['length'].max()}")
+        cols[2].metric("Average Duration", f"{rallies['duration'].mean():.1f} s")
+
+        st.plotly_chart(px.histogram(
+            rallies,
+            x='length',
+            title="Rally Length Distribution",
+            labels={'length': 'Shots per Rally'}
+        ))
+
+        # Daily aggregates keep the trend chart small over long histories
+        daily = rallies.set_index('start')['mean_piq'].resample('D').mean().dropna()
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(
+            x=daily.index,
+            y=daily,
+            name='Mean Rally PIQ',
+            mode='markers',
+            marker=dict(color=self.config.PLOT_COLORS['avg_piq'])
+        ))
+        self.visualizer.add_trend_analysis(
+            fig,
+            pd.Series(daily.index),
+            daily.reset_index(drop=True),
+            'Mean Rally PIQ',
+            window_size=self.viz_options['rolling_window'],
+            show_trendline=self.viz_options['show_trendline'],
+            show_rolling_avg=self.viz_options['show_rolling_avg']
+        )
+        fig.update_layout(
+            title="Per-Rally Quality by Day",
+            xaxis_title="Date",
+            yaxis_title="Mean PIQ per Rally",
+            hovermode='x unified'
+        )
+        st.plotly_chart(fig)
+
     def display_summary_statistics(self):
         st.header("Summary Statistics")
         cols = st.columns(3)
@@ -1,29 +1,69 @@
 import sqlite3
 import json
+from contextlib import closing
+import numpy as np
 import pandas as pd
 import streamlit as st
-from typing import Dict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
 from config import Config
+from disk_cache import disk_cached
 
 class DataManager:
     def __init__(self, config: Config):
         self.config = config
 
     @staticmethod
-    @st.cache_resource
-    def get_connection(_config: Config) -> sqlite3.Connection:
-        return sqlite3.connect(str(_config.DB_PATH))
-
-    @staticmethod
-    @st.cache_data
-    def load_sessions(_config: Config) -> pd.DataFrame:
-        conn = DataManager.get_connection(_config)
-        df = pd.read_sql_query("SELECT * FROM tb_activities", conn)
+    @disk_cached
+    def load_sessions(config: Config) -> pd.DataFrame:
+        with closing(sqlite3.connect(str(config.DB_PATH))) as conn:
+            df = pd.read_sql_query("SELECT * FROM tb_activities", conn)
         df['datetime'] = pd.to_datetime(df['start_time'].astype(float)/1000, unit='s')
-        df['datetime'] = df['datetime'].dt.tz_localize('UTC').dt.tz_convert(_config.TIMEZONE)
+        df['datetime'] = df['datetime'].dt.tz_localize('UTC').dt.tz_convert(config.TIMEZONE)
         df['formatted_time'] = df['datetime'].dt.strftime('%m-%d-%Y %I:%M:%S %p')
         return df.sort_values('datetime', ascending=False)
 
+    @staticmethod
+    @disk_cached
+    def load_light_motions(config: Config, activity_ids: Optional[Tuple[str, ...]]) -> pd.DataFrame:
+        """Load shots for the given activities (all if None) from tb_light_motions.
+
+        The lookup goes through the (activity_id, motion_uuid) index, and the
+        TEXT kpi columns are parsed to float32 once: kpi1 is the effect value,
+        kpi2 the racket speed (m/s) and kpi3 the spin type.
+        """
+        # Own connection, as loaders may run on prefetch or federation threads
+        query = ("SELECT activity_id, motion_uuid, motion_type, motion_time, kpi1, kpi2, kpi3, piqscore "
+                 "FROM tb_light_motions")
+        if activity_ids is not None:
+            query += f" WHERE activity_id IN ({','.join('?' * len(activity_ids))})"
+        with closing(sqlite3.connect(str(config.DB_PATH))) as conn:
+            df = pd.read_sql_query(query, conn, params=list(activity_ids or ()))
+
+        time = pd.to_datetime(df['motion_time'].astype('int64'), unit='ms')
+        return pd.DataFrame({
+            'activity_id': df['activity_id'],
+            'motion_uuid': df['motion_uuid'],
+            'time': time.dt.tz_localize('UTC').dt.tz_convert(config.TIMEZONE).dt.tz_localize(None),
+            'type': df['motion_type'],
+            'spin': df['kpi3'],
+            'EffectValue': pd.to_numeric(df['kpi1'], errors='coerce').to_numpy(np.float32),
+            'SpeedValue': pd.to_numeric(df['kpi2'], errors='coerce').to_numpy(np.float32),
+            'PIQ': df['piqscore'].to_numpy(np.float32)
+        }).sort_values('time', ignore_index=True)
+
+    @staticmethod
+    def has_table(db_path: Path, table: str) -> bool:
+        """Whether db_path is an existing database containing table; never creates the file"""
+        if not Path(db_path).is_file():
+            return False
+        uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+        with closing(sqlite3.connect(uri, uri=True)) as conn:
+            row = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+            ).fetchone()
+        return row is not None
+
     @staticmethod
     def parse_json(json_str: str) -> Dict:
         try:
@@ -0,0 +1,150 @@
+import os
+import uuid
+import hashlib
+import functools
+from pathlib import Path
+from typing import Optional
+import pandas as pd
+import pyarrow as pa
+import streamlit as st
+from config import Config
+
+# The only Config fields disk-cached loaders may read; anything else a loader
+# depends on must be passed as an argument so it becomes part of the key
+SOURCE_FIELDS = ('DB_PATH', 'SHOT_DB_PATH', 'SHOT_SOURCE', 'TIMEZONE')
+
+
+def source_key(config: Config) -> str:
+    """The data source a loader reads, independent of display and registry settings"""
+    return repr({
+        field: str(Path(value).resolve()) if isinstance(value, Path) else value
+        for field, value in ((f, getattr(config, f)) for f in SOURCE_FIELDS)
+    })
+
+
+def db_version(config: Config) -> str:
+    """mtimes of the configured databases; changes whenever either database is written"""
+    versions = []
+    for path in (config.DB_PATH, config.SHOT_DB_PATH):
+        try:
+            versions.append(f"{path}:{os.stat(path).st_mtime_ns}")
+        except FileNotFoundError:
+            versions.append(f"{path}:missing")
+    return '|'.join(versions)
+
+
+class DiskCache:
+    """Content-addressed DataFrame cache shared by every worker process on the host.
+
+    Entries are uncompressed Arrow IPC files, written atomically and read back
+    through a memory map. Numeric columns of a hit reference the mapped pages
+    directly, so workers share one copy through the page cache; string
+    columns are still materialized per process. Hits refresh the file's
+    mtime, and the least recently used entries are evicted once the directory
+    grows past max_bytes.
+    """
+
+    SUFFIX = '.arrow'
+
+    def __init__(self, directory: Path, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _fingerprint(value) -> bytes:
+        if isinstance(value, pd.DataFrame):
+            return (repr(list(value.columns)).encode()
+                    + pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+        return repr(value).encode()
+
+    @staticmethod
+    def key(name: str, config: Config, args: tuple, kwargs: dict) -> str:
+        digest = hashlib.sha256()
+        for part in (name, source_key(config), db_version(config)):
+            digest.update(part.encode())
+        for value in list(args) + sorted(kwargs.items()):
+            digest.update(DiskCache._fingerprint(value))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.SUFFIX}"
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(key)
+        try:
+            with pa.memory_map(str(path)) as source:
+                table = pa.ipc.open_file(source).read_all()
+            os.utime(path)
+        except (FileNotFoundError, pa.ArrowInvalid):
+            return None
+        # split_blocks keeps numeric columns as zero-copy views of the map
+        return table.to_pandas(split_blocks=True)
+
+    def put(self, key: str, df: pd.DataFrame):
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            return
+
+        # Write to a private temp file, then rename so readers never see partial entries
+        tmp_path = self.directory / f".{key}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        with pa.OSFile(str(tmp_path), 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for path in self.directory.glob(f"*{self.SUFFIX}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _memory_cached(key: str, _func, _config: Config, _args: tuple, _kwargs: dict) -> pd.DataFrame:
+    # Hashed on key alone, which already covers the loader, its arguments and the database version
+    return _func(_config, *_args, **_kwargs)
+
+
+def disk_cached(func):
+    """Cache a DataFrame-returning loader whose first argument is the Config on disk.
+
+    The key covers only SOURCE_FIELDS of the Config, so per-player configs
+    share entries with the dashboard's config for the same databases. This is
+    the only cache layer for such loaders: the key includes the database
+    mtimes, so an in-process cache on top would serve stale data. With
+    CACHE_DIR set to None, entries are kept in memory per process under the
+    same key instead.
+    """
+    name = f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(config: Config, *args, **kwargs):
+        key = DiskCache.key(name, config, args, kwargs)
+        if config.CACHE_DIR is None:
+            return _memory_cached(key, func, config, args, kwargs)
+
+        cache = DiskCache(config.CACHE_DIR, config.CACHE_MAX_BYTES)
+        df = cache.get(key)
+        if df is None:
+            df = func(config, *args, **kwargs)
+            cache.put(key, df)
+        return df
+
+    return wrapper
@@ -0,0 +1,114 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Tuple
+import pandas as pd
+import streamlit as st
+from config import Config
+from data_manager import DataManager
+from shot_analyzer import ShotAnalyzer
+
+def discover_players(directory: Path) -> Dict[str, Tuple[Path, Path]]:
+    """Build a player registry by pairing playpop_<name>.db with BabPopExt<name>.db"""
+    players = {}
+    for db_path in sorted(Path(directory).glob('playpop_*.db')):
+        name = db_path.stem[len('playpop_'):]
+        players[name or 'default'] = (db_path, db_path.with_name(f"BabPopExt{name}.db"))
+    return players
+
+
+def _load_player_sessions(config: Config) -> pd.DataFrame:
+    return DataManager.load_sessions(config)
+
+
+def _load_player_shots(config: Config, sessions: pd.DataFrame) -> pd.DataFrame:
+    if sessions.empty:
+        return pd.DataFrame()
+    return ShotAnalyzer.load_comparison_shots(config, sessions)
+
+
+@st.cache_resource
+def _process_pool(max_workers: int) -> ProcessPoolExecutor:
+    # spawn: forking a process that runs server threads is unsafe
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+class Federation:
+    """Loads data for every registered player in parallel worker processes.
+
+    Loading is mostly SQLite reads and pandas work that holds the GIL, so
+    players are spread over a shared process pool rather than threads. Each
+    player's load goes through the regular disk-cached loaders with a
+    per-player Config; entries are keyed by the databases read, so a player
+    whose databases the dashboard also uses shares its entries. The combined
+    frames carry a categorical `player` column.
+    Players whose last load failed are reported in `errors` instead of
+    failing the whole team view.
+    """
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.players = list(config.PLAYERS)
+        self.errors: Dict[str, Exception] = {}
+
+    def _fan_out(self, load, args: Dict[str, tuple]) -> pd.DataFrame:
+        """Run load(player_config, *args[name]) for every player"""
+        self.errors = {}
+        workers = max(1, min(self.config.FEDERATION_MAX_WORKERS, len(self.players)))
+
+        def submit(pool: ProcessPoolExecutor):
+            return {name: pool.submit(load, self.config.for_player(name), *args.get(name, ()))
+                    for name in self.players}
+
+        try:
+            futures = submit(_process_pool(workers))
+        except BrokenProcessPool:
+            _process_pool.clear()
+            futures = submit(_process_pool(workers))
+
+        frames = []
+        for name, future in futures.items():
+            try:
+                df = future.result()
+            except BrokenProcessPool as e:
+                # A crashed worker breaks the pool; start a fresh one next time
+                _process_pool.clear()
+                self.errors[name] = e
+                continue
+            except Exception as e:
+                self.errors[name] = e
+                continue
+            if not df.empty:
+                frames.append(df.assign(player=name))
+        if not frames:
+            return pd.DataFrame(columns=['player'])
+
+        df = pd.concat(frames, ignore_index=True)
+        df['player'] = pd.Categorical(df['player'], categories=self.players)
+        return df
+
+    def load_sessions(self) -> pd.DataFrame:
+        """Sessions of all players, newest first"""
+        df = self._fan_out(_load_player_sessions, {})
+        return df.sort_values('datetime', ascending=False) if 'datetime' in df.columns else df
+
+    def load_shots(self, sessions: pd.DataFrame) -> pd.DataFrame:
+        """Shots for the given team sessions, tagged by player and session_id"""
+        columns = ['_id', 'local_id', 'datetime']
+        args = {name: (sessions.loc[sessions['player'] == name, columns],)
+                for name in self.players}
+        return self._fan_out(_load_player_shots, args)
+
+    def leaderboard(self, sessions: pd.DataFrame) -> pd.DataFrame:
+        """Per-player summary ranked by best PIQ"""
+        board = sessions.groupby('player', observed=True).agg(
+            sessions=('_id', 'count'),
+            total_shots=('total_shot_count', 'sum'),
+            avg_piq=('piq_score', 'mean'),
+            best_piq=('max_piq_score', 'max'),
+            best_serve_speed=('max_serve_speed', 'max'),
+            last_session=('datetime', 'max')
+        )
+        board['best_serve_speed'] *= self.config.SPEED_CONVERSION_FACTOR
+        return board.sort_values('best_piq', ascending=False)
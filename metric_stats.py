@@ -0,0 +1,83 @@
+from typing import Iterable, List
+import numpy as np
+import pandas as pd
+from sketches import TDigest
+
+class MetricStats:
+    """Mergeable running statistics (count, mean, co-moments, min, max, quartiles) over metric columns.
+
+    Partial results are combined with the pairwise Welford/Chan update, so the
+    statistics of any union of subsets come from merging instead of rescanning;
+    quartiles are estimated from a t-digest per metric. Rows with a missing
+    value in any metric are skipped.
+    """
+
+    QUARTILES = [0.25, 0.5, 0.75]
+
+    def __init__(self, columns: List[str]):
+        k = len(columns)
+        self.columns = list(columns)
+        self.digests = [TDigest() for _ in columns]
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: List[str]) -> 'MetricStats':
+        """Accumulate the given columns of df in one vectorized pass"""
+        stats = cls(columns)
+        values = df[columns].to_numpy(dtype=float)
+        values = values[~np.isnan(values).any(axis=1)]
+        if len(values):
+            stats.n = len(values)
+            stats.mean = values.mean(axis=0)
+            centered = values - stats.mean
+            stats.comoment = centered.T @ centered
+            stats.min = values.min(axis=0)
+            stats.max = values.max(axis=0)
+            for digest, column in zip(stats.digests, values.T):
+                digest.update(column)
+        return stats
+
+    @classmethod
+    def merge_all(cls, parts: Iterable['MetricStats'], columns: List[str]) -> 'MetricStats':
+        stats = cls(columns)
+        for part in parts:
+            stats.merge(part)
+        return stats
+
+    def merge(self, other: 'MetricStats') -> 'MetricStats':
+        if other.columns != self.columns:
+            raise ValueError("Cannot merge statistics over different columns")
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.comoment = self.comoment + other.comoment + np.outer(delta, delta) * self.n * other.n / n
+        self.mean = self.mean + delta * other.n / n
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        for digest, other_digest in zip(self.digests, other.digests):
+            digest.merge(other_digest)
+        self.n = n
+        return self
+
+    def describe(self) -> pd.DataFrame:
+        """Summary table with the rows of DataFrame.describe(); quartiles are t-digest estimates"""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.sqrt(np.diag(self.comoment) / (self.n - 1)) if self.n > 1 else np.full(len(self.columns), np.nan)
+        quartiles = np.array([digest.quantile(self.QUARTILES) for digest in self.digests]).reshape(-1, 3).T
+        return pd.DataFrame(
+            [np.full(len(self.columns), self.n), self.mean, std, self.min, *quartiles, self.max],
+            index=['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max'],
+            columns=self.columns
+        )
+
+    def corr(self) -> pd.DataFrame:
+        """Pearson correlation matrix"""
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.comoment / np.outer(scale, scale)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
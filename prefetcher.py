@@ -0,0 +1,65 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable
+import streamlit as st
+from config import Config
+
+class SessionPrefetcher:
+    """Warms cached loaders in the background for sessions likely to be opened next.
+
+    One pool is shared by all browser sessions, so PREFETCH_MAX_WORKERS caps the
+    number of concurrent loads. Each browser session owns its queued jobs; a new
+    request from the same owner cancels its jobs that have not started yet.
+    Finished jobs are forgotten as soon as they complete, so the results and
+    owners of closed browser sessions are not retained.
+    """
+
+    def __init__(self, max_workers: int):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        self._futures: Dict[Hashable, Dict[Hashable, Future]] = {}
+        # Reentrant: cancelling under the lock runs _discard synchronously
+        self._lock = threading.RLock()
+
+    @staticmethod
+    @st.cache_resource
+    def get(_config: Config) -> 'SessionPrefetcher':
+        return SessionPrefetcher(_config.PREFETCH_MAX_WORKERS)
+
+    def prefetch(self, owner: Hashable, jobs: Dict[Hashable, Callable[[], object]]):
+        """Replace owner's pending jobs with the given ones, keeping jobs that are already queued or running"""
+        with self._lock:
+            current = self._futures.get(owner, {})
+            for key, future in list(current.items()):
+                if key not in jobs:
+                    future.cancel()
+
+            futures, submitted = {}, []
+            for key, job in jobs.items():
+                future = current.get(key)
+                if future is None or future.done():
+                    future = self.executor.submit(job)
+                    submitted.append(key)
+                futures[key] = future
+            self._futures[owner] = futures
+
+            # Registered once the owner's jobs are in place, so a job that already
+            # finished is discarded immediately
+            for key in submitted:
+                futures[key].add_done_callback(lambda f, key=key: self._discard(owner, key, f))
+            if not futures:
+                self._futures.pop(owner, None)
+
+    def _discard(self, owner: Hashable, key: Hashable, future: Future):
+        """Forget a finished job, and its owner once none of its jobs are pending"""
+        with self._lock:
+            futures = self._futures.get(owner)
+            if futures is not None and futures.get(key) is future:
+                del futures[key]
+                if not futures:
+                    del self._futures[owner]
+
+    def cancel(self, owner: Hashable):
+        """Cancel all of owner's jobs that have not started"""
+        with self._lock:
+            for future in self._futures.pop(owner, {}).values():
+                future.cancel()
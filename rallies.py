@@ -0,0 +1,73 @@
+import sqlite3
+from contextlib import closing
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import Config
+from disk_cache import disk_cached
+
+def segment_rallies(shots: pd.DataFrame, max_gap_seconds: float) -> pd.DataFrame:
+    """Split time-ordered shots into rallies without Python-level loops.
+
+    A new rally starts when the gap to the previous shot exceeds
+    max_gap_seconds, when `stroke_counter` fails to increase (counter reset),
+    or when `activity_id` changes. Returns one row per rally with its start
+    time, length (shots), duration (seconds) and mean PIQ.
+    """
+    n = len(shots)
+    if n == 0:
+        return pd.DataFrame(columns=['start', 'length', 'duration', 'mean_piq'])
+
+    times = shots['time'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    breaks = np.diff(times) > int(max_gap_seconds * 1e9)
+    if 'stroke_counter' in shots.columns:
+        breaks |= np.diff(shots['stroke_counter'].to_numpy()) <= 0
+    if 'activity_id' in shots.columns:
+        activity = shots['activity_id'].to_numpy()
+        breaks |= activity[1:] != activity[:-1]
+
+    starts = np.flatnonzero(np.r_[True, breaks])
+    ends = np.r_[starts[1:], n] - 1
+    lengths = np.diff(np.r_[starts, n])
+
+    piq = shots['PIQ'].to_numpy(dtype=float)
+    valid = ~np.isnan(piq)
+    piq_sum = np.add.reduceat(np.where(valid, piq, 0.0), starts)
+    piq_count = np.add.reduceat(valid.astype(np.int64), starts)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_piq = piq_sum / piq_count
+
+    return pd.DataFrame({
+        'start': shots['time'].to_numpy()[starts],
+        'length': lengths.astype(np.int32),
+        'duration': ((times[ends] - times[starts]) / 1e9).astype(np.float32),
+        'mean_piq': mean_piq.astype(np.float32)
+    })
+
+
+@disk_cached
+def load_rallies(config: Config, max_gap_seconds: float) -> pd.DataFrame:
+    """Segment the whole shot history of the configured shot source into rallies"""
+    if config.SHOT_SOURCE == 'light_motions':
+        query = """
+        SELECT activity_id, motion_time AS time, piqscore AS PIQ
+        FROM tb_light_motions ORDER BY motion_time
+        """
+        db_path, ns_per_unit = config.DB_PATH, 1_000_000  # ms
+    else:
+        # Only the columns rallies need, deduplicated and ordered in SQL
+        query = """
+        SELECT DISTINCT time, stroke_counter, SpeedScore + StyleScore + EffectScore AS PIQ
+        FROM motions ORDER BY time
+        """
+        db_path, ns_per_unit = config.SHOT_DB_PATH, 100_000  # 1/10000 s
+
+    # Read-only so a missing database is an error rather than a new empty file
+    uri = f"{Path(db_path).resolve().as_uri()}?mode=ro"
+    with closing(sqlite3.connect(uri, uri=True)) as conn:
+        shots = pd.read_sql_query(query, conn)
+
+    time = pd.to_datetime(shots['time'].astype('int64') * ns_per_unit, unit='ns')
+    shots['time'] = time.dt.tz_localize('UTC').dt.tz_convert(config.TIMEZONE).dt.tz_localize(None)
+
+    return segment_rallies(shots, max_gap_seconds)
@@ -1,3 +1,5 @@
+import sqlite3
+from contextlib import closing
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 import streamlit as st
@@ -9,12 +11,22 @@ import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
 import wrangle
+from data_manager import DataManager
+from sketches import SketchStore
+from metric_stats import MetricStats
+from disk_cache import db_version, disk_cached
 from datetime import datetime, timedelta
+from pathlib import Path
 import pytz
 
 class ShotAnalyzer:
     """Handles shot-by-shot analysis for a specific session"""
     
+    METRICS = ['PIQ', 'StyleScore', 'StyleValue', 'EffectScore',
+               'EffectValue', 'SpeedScore', 'SpeedValue']
+    
+    LIGHT_METRICS = ['PIQ', 'EffectValue', 'SpeedValue']
+    
     def __init__(self, config):
         self.config = config
         
@@ -25,10 +37,159 @@ class ShotAnalyzer:
         pass
     
     @staticmethod
-    @st.cache_data
-    def load_shot_data(_config, session_id: str, session_datetime: datetime) -> pd.DataFrame:
+    def source_metrics(config) -> List[str]:
+        """Metrics provided by the configured shot source"""
+        return ShotAnalyzer.LIGHT_METRICS if config.SHOT_SOURCE == 'light_motions' else ShotAnalyzer.METRICS
+    
+    @staticmethod
+    def shot_source_available(config) -> bool:
+        """Whether the configured shot source database and table exist"""
+        if config.SHOT_SOURCE == 'light_motions':
+            return DataManager.has_table(config.DB_PATH, 'tb_light_motions')
+        return DataManager.has_table(config.SHOT_DB_PATH, 'motions')
+    
+    @staticmethod
+    def categorize_stroke(stroke_type) -> str:
+        """Map a raw stroke type to Serve/Forehand/Backhand/Other"""
+        stroke_lower = str(stroke_type).lower()
+        if 'serve' in stroke_lower:
+            return 'Serve'
+        elif 'forehand' in stroke_lower:
+            return 'Forehand'
+        elif 'backhand' in stroke_lower:
+            return 'Backhand'
+        else:
+            return 'Other'
+    
+    @staticmethod
+    def categorize_strokes(types: pd.Series) -> pd.Series:
+        """Categorize a column of stroke types, classifying each distinct type once"""
+        return types.map({t: ShotAnalyzer.categorize_stroke(t) for t in types.unique()})
+    
+    @staticmethod
+    def session_windows(session_datetimes: List[datetime]) -> List[Tuple[datetime, datetime]]:
+        """Return the +/-1h windows around the given session starts, with overlapping windows merged"""
+        windows = []
+        for start in sorted(session_datetimes):
+            window = (start - pd.Timedelta(hours=1), start + pd.Timedelta(hours=1))
+            if windows and window[0] <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], window[1])
+            else:
+                windows.append(window)
+        return windows
+    
+    @staticmethod
+    def assign_sessions(shots: pd.DataFrame, sessions_df: pd.DataFrame) -> pd.DataFrame:
+        """Tag each shot with the nearest session starting within one hour of it"""
+        starts = pd.DataFrame({
+            'session_start': sessions_df['datetime'].dt.tz_localize(None).astype('datetime64[ns]'),
+            'session_id': sessions_df['_id']
+        }).sort_values('session_start')
+        
+        shots = shots.assign(time=shots['time'].astype('datetime64[ns]')).sort_values('time')
+        tagged = pd.merge_asof(
+            shots,
+            starts,
+            left_on='time',
+            right_on='session_start',
+            direction='nearest',
+            tolerance=pd.Timedelta(hours=1)
+        )
+        tagged = tagged.dropna(subset=['session_id']).drop(columns='session_start')
+        return tagged.astype({'session_id': 'int64'})
+    
+    @staticmethod
+    def load_tagged_shots(config, sessions: pd.DataFrame, full_history: bool = False,
+                          session_ids: Optional[List[int]] = None) -> pd.DataFrame:
+        """Load shots for the given sessions in one query, tagged by session_id.
+
+        With session_ids only the shots of those sessions are kept, though each
+        shot is still tagged with the nearest of all `sessions`. With
+        full_history the whole shot table is read and tagged, which is cheaper
+        than filtering when the load covers most sessions.
+        """
+        loaded = sessions if session_ids is None else sessions[sessions['_id'].isin(session_ids)]
+        if config.SHOT_SOURCE == 'light_motions':
+            activity_ids = None if full_history else tuple(loaded['local_id'])
+            df = DataManager.load_light_motions(config, activity_ids)
+            df = df.assign(session_id=df['activity_id'].map(sessions.set_index('local_id')['_id']))
+            df = df.dropna(subset=['session_id']).astype({'session_id': 'int64'})
+        else:
+            windows = None if full_history else ShotAnalyzer.session_windows(loaded['datetime'].tolist())
+            df = wrangle.wrangle(config.SHOT_DB_PATH, windows)
+            df = ShotAnalyzer.assign_sessions(df, sessions)
+        if session_ids is not None:
+            df = df[df['session_id'].isin(session_ids)]
+        df['stroke_category'] = ShotAnalyzer.categorize_strokes(df['type'])
+        return df
+    
+    @staticmethod
+    def session_shot_counts(config, sessions: pd.DataFrame) -> pd.Series:
+        """Shot count per session _id, computed without loading the shot rows.
+
+        light_motions counts through the activity_id index; motions reads only
+        the time column and assigns each time to the nearest session start
+        within one hour, as assign_sessions does.
+        """
+        if config.SHOT_SOURCE == 'light_motions':
+            uri = f"{Path(config.DB_PATH).resolve().as_uri()}?mode=ro"
+            with closing(sqlite3.connect(uri, uri=True)) as conn:
+                counts = pd.read_sql_query(
+                    "SELECT activity_id, COUNT(*) AS shots FROM tb_light_motions GROUP BY activity_id", conn
+                ).set_index('activity_id')['shots']
+            return sessions.set_index('_id')['local_id'].map(counts).fillna(0).astype('int64')
+        
+        if sessions.empty:
+            return pd.Series(dtype='int64')
+        uri = f"{Path(config.SHOT_DB_PATH).resolve().as_uri()}?mode=ro"
+        with closing(sqlite3.connect(uri, uri=True)) as conn:
+            times = pd.read_sql_query("SELECT time FROM motions", conn)['time'].to_numpy(np.int64)
+        
+        # Session starts in the motions time unit (1/10000 s)
+        starts = ((sessions['datetime'] - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(microseconds=100)).to_numpy(np.int64)
+        order = np.argsort(starts, kind='stable')
+        starts = starts[order]
+        right = np.minimum(np.searchsorted(starts, times), len(starts) - 1)
+        left = np.maximum(right - 1, 0)
+        nearest = np.where(np.abs(times - starts[left]) <= np.abs(starts[right] - times), left, right)
+        within = np.abs(times - starts[nearest]) <= 3600 * 10000
+        counts = np.bincount(nearest[within], minlength=len(starts))
+        return pd.Series(counts, index=sessions['_id'].to_numpy()[order], dtype='int64')
+    
+    @staticmethod
+    def build_sketches(config, sessions_df: pd.DataFrame) -> SketchStore:
+        """Return the sketch store, first sketching sessions that are new or whose shot count changed.
+
+        Nothing is read while the databases are unchanged. Only one worker
+        updates at a time; the others use the stored sketches meanwhile.
+        """
+        store = SketchStore(config)
+        if not store.is_stale():
+            return store
+        with store.lock() as acquired:
+            if not acquired:
+                return store
+            counts = ShotAnalyzer.session_shot_counts(config, sessions_df)
+            stale = store.stale_sessions(counts)
+            if stale:
+                shots = ShotAnalyzer.load_tagged_shots(
+                    config, sessions_df, full_history=len(stale) > len(counts) // 2, session_ids=stale)
+            else:
+                shots = pd.DataFrame(columns=['session_id', 'stroke_category'])
+            store.update(shots, ShotAnalyzer.source_metrics(config), counts, stale)
+        return store
+    
+    @staticmethod
+    @disk_cached
+    def load_shot_data(config, session_id: str, session_datetime: datetime,
+                       activity_id: Optional[str] = None) -> pd.DataFrame:
         """Load shot data for a specific session"""
-        df = wrangle.wrangle(_config.SHOT_DB_PATH)
+        if config.SHOT_SOURCE == 'light_motions':
+            # Exact attribution through the activity_id index
+            df = DataManager.load_light_motions(config, (activity_id,))
+            return df.assign(stroke_category=ShotAnalyzer.categorize_strokes(df['type']))
+        
+        df = wrangle.wrangle(config.SHOT_DB_PATH, ShotAnalyzer.session_windows([session_datetime]))
         
         # Convert string time back to datetime and make timezone-naive
         df['time'] = pd.to_datetime(df['time'])
@@ -37,18 +198,7 @@ class ShotAnalyzer:
         naive_session_datetime = session_datetime.replace(tzinfo=None)
         
         # Add stroke categorization
-        def categorize_stroke(row):
-            stroke_lower = str(row).lower()
-            if 'serve' in stroke_lower:
-                return 'Serve'
-            elif 'forehand' in stroke_lower:
-                return 'Forehand'
-            elif 'backhand' in stroke_lower:
-                return 'Backhand'
-            else:
-                return 'Other'
-        
-        df['stroke_category'] = df['type'].apply(categorize_stroke)
+        df['stroke_category'] = ShotAnalyzer.categorize_strokes(df['type'])
         
         # Filter for the specific session (within a 2-hour window of the session start time)
         session_start = naive_session_datetime - pd.Timedelta(hours=1)
@@ -62,10 +212,41 @@ class ShotAnalyzer:
         
         return df
 
-    def render_shot_analysis(self, session_id: str, session_datetime: datetime):
+    @staticmethod
+    @st.cache_data
+    def load_shot_stats(config, version: str, session_id: str, session_datetime: datetime,
+                        activity_id: Optional[str] = None) -> Dict[Tuple[str, str, str], MetricStats]:
+        """Metric statistics per (type, spin, stroke_category) group of a session's shots.
+
+        version is the database version (disk_cache.db_version) and only keys the cache.
+        """
+        df = ShotAnalyzer.load_shot_data(config, session_id, session_datetime, activity_id)
+        metrics = ShotAnalyzer.source_metrics(config)
+        return {
+            key: MetricStats.from_frame(group, metrics)
+            for key, group in df.groupby(['type', 'spin', 'stroke_category'], dropna=False)
+        }
+
+    @staticmethod
+    @disk_cached
+    def load_comparison_shots(config, sessions: pd.DataFrame) -> pd.DataFrame:
+        """Load shots for several sessions in one query, tagged by session_id"""
+        return ShotAnalyzer.load_tagged_shots(config, sessions)
+
+    @staticmethod
+    def compare_sessions(shots: pd.DataFrame, metrics: List[str]) -> pd.DataFrame:
+        """Per-session, per-stroke statistics for the given metrics in a single aggregation"""
+        return shots.groupby(['session_id', 'stroke_category'])[metrics].agg(['count', 'mean', 'median', 'max'])
+
+    def render_shot_analysis(self, session_id: str, session_datetime: datetime,
+                             activity_id: Optional[str] = None):
         """Main entry point for shot analysis visualization"""
+        if not self.shot_source_available(self.config):
+            st.warning("No shot data source found; check the shot database settings in config.py.")
+            return
+        
         # Load data for this session
-        df = self.load_shot_data(self.config, session_id, session_datetime)
+        df = self.load_shot_data(self.config, session_id, session_datetime, activity_id)
         
         if df.empty:
             st.warning("No shot data found for this session.")
@@ -81,12 +262,23 @@ class ShotAnalyzer:
             st.warning("No shots match the selected filters.")
             return
             
+        # Merge the statistics of the filtered groups instead of rescanning the shots
+        group_stats = self.load_shot_stats(
+            self.config, db_version(self.config), session_id, session_datetime, activity_id)
+        stats = MetricStats.merge_all(
+            (part for (shot_type, spin, category), part in group_stats.items()
+             if shot_type in self.selected_types
+             and spin in self.selected_spins
+             and category in self.stroke_categories),
+            self.source_metrics(self.config)
+        )
+            
         # Render visualizations
         self._render_scatter_plot(filtered_df)
         self._render_histogram(filtered_df)
         self._render_line_plot(filtered_df)
-        self._render_correlation_heatmap(filtered_df)
-        self._render_summary_stats(filtered_df)
+        self._render_correlation_heatmap(stats)
+        self._render_summary_stats(stats)
 
     def _setup_filters(self, df: pd.DataFrame):
         """Setup sidebar filters"""
@@ -126,8 +318,7 @@ class ShotAnalyzer:
         st.header("Shot Distribution")
         
         # Available metrics for axes
-        metrics = ['PIQ', 'StyleScore', 'StyleValue', 'EffectScore', 
-                  'EffectValue', 'SpeedScore', 'SpeedValue']
+        metrics = self.source_metrics(self.config)
         
         # Axis selection
         col1, col2 = st.columns(2)
@@ -169,8 +360,7 @@ class ShotAnalyzer:
         """Render histogram visualization"""
         st.header("Shot Distribution Histogram")
         
-        metrics = ['PIQ', 'StyleScore', 'StyleValue', 'EffectScore', 
-                  'EffectValue', 'SpeedScore', 'SpeedValue']
+        metrics = self.source_metrics(self.config)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -191,8 +381,7 @@ class ShotAnalyzer:
         """Render line plot visualization"""
         st.header("Shot Progression")
         
-        metrics = ['PIQ', 'StyleScore', 'StyleValue', 'EffectScore', 
-                  'EffectValue', 'SpeedScore', 'SpeedValue']
+        metrics = self.source_metrics(self.config)
         
         col1, col2 = st.columns(2)
         with col1:
@@ -237,15 +426,12 @@ class ShotAnalyzer:
         )
         st.plotly_chart(fig)
 
-    def _render_correlation_heatmap(self, df: pd.DataFrame):
+    def _render_correlation_heatmap(self, stats: MetricStats):
         """Render correlation heatmap"""
         st.header("Metric Correlations")
         
-        # Select only numeric columns
-        numeric_df = df.select_dtypes(include=['number'])
-        
-        # Calculate correlation matrix
-        corr = numeric_df.corr()
+        # Correlation matrix from the accumulated co-moments
+        corr = stats.corr()
         
         # Create heatmap
         fig, ax = plt.subplots(figsize=(10, 8))
@@ -258,13 +444,113 @@ class ShotAnalyzer:
         )
         st.pyplot(fig)
 
-    def _render_summary_stats(self, df: pd.DataFrame):
+    def _render_summary_stats(self, stats: MetricStats):
         """Render summary statistics"""
         st.header("Summary Statistics")
         
-        # Calculate summary statistics
-        summary = df.describe()
+        # Summary statistics from the accumulated moments
+        summary = stats.describe()
         
         # Display in a more readable format
         st.dataframe(summary.style.format("{:.2f}"))
 
+    def render_multi_session_distribution(self, sessions_df: pd.DataFrame):
+        """Render metric distributions merged from per-session sketches"""
+        st.header("Shot Metric Distribution")
+        
+        if not self.shot_source_available(self.config):
+            st.warning("No shot data source found; check the shot database settings in config.py.")
+            return
+        
+        dates = sessions_df['datetime'].dt.date
+        col1, col2 = st.columns(2)
+        with col1:
+            date_range = st.date_input(
+                "Session date range",
+                value=(dates.min(), dates.max()),
+                key='sketch_date_range'
+            )
+        with col2:
+            metric = st.selectbox("Select metric", self.source_metrics(self.config), index=0, key='sketch_metric')
+        
+        if len(date_range) != 2:
+            return
+        selected = sessions_df[(dates >= date_range[0]) & (dates <= date_range[1])]
+        
+        store = self.build_sketches(self.config, sessions_df)
+        merged = store.merged(selected['_id'].tolist(), metric)
+        if not merged:
+            st.warning("No shot data found for the selected sessions.")
+            return
+        
+        fig = go.Figure()
+        percentiles = {}
+        for category, (hist, digest) in sorted(merged.items()):
+            bins = hist.to_frame()
+            fig.add_trace(go.Bar(
+                x=(bins['bin_start'] + bins['bin_end']) / 2,
+                y=bins['count'],
+                width=hist.bin_width,
+                name=category,
+                opacity=0.7
+            ))
+            percentiles[category] = dict(zip(
+                ['count', 'min', 'p5', 'p25', 'median', 'p75', 'p95', 'max'],
+                [digest.count, *digest.quantile([0, 0.05, 0.25, 0.5, 0.75, 0.95, 1])]
+            ))
+        
+        fig.update_layout(
+            title=f"Distribution of {metric} across {len(selected)} sessions",
+            xaxis_title=metric,
+            yaxis_title="Shots",
+            barmode='overlay'
+        )
+        st.plotly_chart(fig)
+        
+        st.markdown("### Percentiles")
+        st.dataframe(pd.DataFrame(percentiles).T.style.format("{:.2f}"))
+
+    def render_session_comparison(self, sessions: pd.DataFrame):
+        """Compare per-stroke metrics side by side across the selected sessions"""
+        st.header("Session Comparison")
+        
+        if not self.shot_source_available(self.config):
+            st.warning("No shot data source found; check the shot database settings in config.py.")
+            return
+        
+        shots = self.load_comparison_shots(self.config, sessions[['_id', 'local_id', 'datetime']])
+        if shots.empty:
+            st.warning("No shot data found for the selected sessions.")
+            return
+        
+        metrics = self.source_metrics(self.config)
+        stats = self.compare_sessions(shots, metrics)
+        labels = sessions.set_index('_id')['formatted_time']
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            metric = st.selectbox("Select metric", metrics, index=0, key='comparison_metric')
+        with col2:
+            statistic = st.selectbox("Statistic", ['mean', 'median', 'max'], key='comparison_stat')
+        
+        plot_df = stats[(metric, statistic)].rename(metric).reset_index()
+        plot_df['session'] = plot_df['session_id'].map(labels)
+        fig = px.bar(
+            plot_df,
+            x='stroke_category',
+            y=metric,
+            color='session',
+            barmode='group',
+            title=f"{statistic.title()} {metric} by Stroke"
+        )
+        st.plotly_chart(fig)
+        
+        st.markdown("### Shot Counts")
+        counts = stats[(metric, 'count')].unstack('stroke_category', fill_value=0)
+        counts.index = counts.index.map(labels)
+        st.dataframe(counts)
+        
+        st.markdown(f"### {metric} Statistics")
+        table = stats[metric].copy()
+        table.index = table.index.set_levels(table.index.levels[0].map(labels), level=0)
+        st.dataframe(table.style.format("{:.2f}"))
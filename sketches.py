@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from config import Config
+
+class Histogram:
+    """Sparse fixed-width histogram; every sketch of a metric shares its bin grid, so merging is bin-wise addition"""
+
+    def __init__(self, bin_width: float, counts: Optional[Dict[int, int]] = None):
+        self.bin_width = float(bin_width)
+        self.counts = dict(counts) if counts else {}
+
+    @property
+    def count(self) -> int:
+        return int(sum(self.counts.values()))
+
+    def update(self, values: np.ndarray) -> 'Histogram':
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        bins, counts = np.unique(np.floor(values / self.bin_width).astype(np.int64), return_counts=True)
+        for b, c in zip(bins.tolist(), counts.tolist()):
+            self.counts[b] = self.counts.get(b, 0) + c
+        return self
+
+    def merge(self, other: 'Histogram') -> 'Histogram':
+        if other.bin_width != self.bin_width:
+            raise ValueError(f"Cannot merge histograms with bin widths {self.bin_width} and {other.bin_width}")
+        for b, c in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + c
+        return self
+
+    def to_frame(self) -> pd.DataFrame:
+        """Return bins as a frame with bin_start, bin_end and count columns"""
+        bins = np.array(sorted(self.counts), dtype=np.int64)
+        return pd.DataFrame({
+            'bin_start': bins * self.bin_width,
+            'bin_end': (bins + 1) * self.bin_width,
+            'count': [self.counts[b] for b in bins.tolist()]
+        })
+
+    def to_dict(self) -> Dict:
+        return {'bin_width': self.bin_width, 'counts': {str(b): c for b, c in self.counts.items()}}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Histogram':
+        return cls(data['bin_width'], {int(b): c for b, c in data['counts'].items()})
+
+
+class TDigest:
+    """Merging t-digest for approximate quantiles.
+
+    Centroids are compressed with the arcsine scale function, which keeps the
+    tails finely resolved; merging two digests is a concatenate-and-compress.
+    """
+
+    def __init__(self, compression: int = 100, means: Optional[np.ndarray] = None,
+                 weights: Optional[np.ndarray] = None, min_value: float = np.inf,
+                 max_value: float = -np.inf):
+        self.compression = int(compression)
+        self.means = np.asarray(means if means is not None else [], dtype=float)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=float)
+        self.min = float(min_value)
+        self.max = float(max_value)
+
+    @property
+    def count(self) -> int:
+        return int(self.weights.sum())
+
+    def update(self, values: np.ndarray) -> 'TDigest':
+        values = np.asarray(values, dtype=float)
+        values = values[np.isfinite(values)]
+        if values.size == 0:
+            return self
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self._compress(np.concatenate([self.means, values]),
+                       np.concatenate([self.weights, np.ones(values.size)]))
+        return self
+
+    def merge(self, other: 'TDigest') -> 'TDigest':
+        if other.weights.size == 0:
+            return self
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(np.concatenate([self.means, other.means]),
+                       np.concatenate([self.weights, other.weights]))
+        return self
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray):
+        order = np.argsort(means, kind='stable')
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+
+        # Bucket each centroid by the integer part of k(q) at its midpoint;
+        # neighbours sharing a bucket are folded into one weighted centroid
+        q_mid = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_mid - 1)
+        buckets = np.floor(k).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, np.diff(buckets) != 0])
+
+        merged_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / merged_weights
+        self.weights = merged_weights
+
+    def quantile(self, q) -> np.ndarray:
+        """Estimate the value at quantile(s) q in [0, 1]"""
+        q = np.asarray(q, dtype=float)
+        if self.weights.size == 0:
+            return np.full(q.shape, np.nan)
+        total = self.weights.sum()
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.r_[0.0, centers, total]
+        values = np.r_[self.min, self.means, self.max]
+        return np.interp(q * total, positions, values)
+
+    def to_dict(self) -> Dict:
+        return {
+            'compression': self.compression,
+            'means': self.means.tolist(),
+            'weights': self.weights.tolist(),
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'TDigest':
+        return cls(data['compression'], data['means'], data['weights'], data['min'], data['max'])
+
+
+class SketchStore:
+    """Per-session, per-stroke metric sketches persisted in a sidecar SQLite file.
+
+    Sketches are kept per session together with the session's shot count, so
+    an update only rebuilds sessions that are new or whose shot count changed.
+    Updates are single-writer: a worker takes the `build_lock` row in
+    sketch_meta, and other workers keep serving the stored sketches meanwhile.
+    Multi-session views merge the stored sketches instead of reloading raw
+    shots.
+    """
+
+    LOCK_TIMEOUT_SECONDS = 600
+
+    def __init__(self, config: Config):
+        self.config = config
+        self.path = str(config.SKETCH_DB_PATH)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS shot_sketches (
+                    session_id INTEGER NOT NULL,
+                    stroke_category TEXT NOT NULL,
+                    metric TEXT NOT NULL,
+                    histogram_json TEXT NOT NULL,
+                    digest_json TEXT NOT NULL,
+                    PRIMARY KEY (session_id, stroke_category, metric)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sketch_sessions (
+                    session_id INTEGER PRIMARY KEY,
+                    shot_count INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS sketch_meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _meta(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM sketch_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def settings(self) -> str:
+        """Shot source and sketch settings; sketches built with other settings are discarded"""
+        config = self.config
+        db_path = config.DB_PATH if config.SHOT_SOURCE == 'light_motions' else config.SHOT_DB_PATH
+        return json.dumps({
+            'source': config.SHOT_SOURCE,
+            'db_path': str(Path(db_path).resolve()),
+            'compression': config.SKETCH_COMPRESSION,
+            'bin_widths': config.SKETCH_BIN_WIDTHS
+        }, sort_keys=True)
+
+    def source_version(self) -> str:
+        """Settings plus the mtimes of the session and shot databases"""
+        config = self.config
+        paths = [config.DB_PATH] if config.SHOT_SOURCE == 'light_motions' else [config.DB_PATH, config.SHOT_DB_PATH]
+        return json.dumps({
+            'settings': self.settings(),
+            'mtimes': [os.stat(path).st_mtime_ns for path in paths]
+        }, sort_keys=True)
+
+    def is_stale(self) -> bool:
+        """Whether the databases or settings changed since the last update, so shot counts need checking"""
+        with closing(self._connect()) as conn:
+            return self._meta(conn, 'source_version') != self.source_version()
+
+    def stale_sessions(self, counts: pd.Series) -> List[int]:
+        """Sessions of counts (session_id -> shot count) that are missing or whose shot count changed"""
+        with closing(self._connect()) as conn:
+            if self._meta(conn, 'settings') != self.settings():
+                return [int(s) for s in counts.index]
+            stored = dict(conn.execute("SELECT session_id, shot_count FROM sketch_sessions").fetchall())
+        return [int(s) for s, c in counts.items() if stored.get(int(s)) != int(c)]
+
+    @contextmanager
+    def lock(self):
+        """Yield True if this worker holds the build lock, False if another worker is updating"""
+        token = f"{time.time():.6f}:{os.getpid()}:{uuid.uuid4().hex}"
+        with closing(self._connect()) as conn:
+            with conn:
+                # A lock older than LOCK_TIMEOUT_SECONDS belongs to a crashed worker
+                conn.execute("DELETE FROM sketch_meta WHERE key = 'build_lock' AND CAST(value AS REAL) < ?",
+                             (time.time() - self.LOCK_TIMEOUT_SECONDS,))
+                acquired = conn.execute("INSERT OR IGNORE INTO sketch_meta VALUES ('build_lock', ?)",
+                                        (token,)).rowcount == 1
+            try:
+                yield acquired
+            finally:
+                if acquired:
+                    with conn:
+                        conn.execute("DELETE FROM sketch_meta WHERE key = 'build_lock' AND value = ?", (token,))
+
+    def update(self, shots: pd.DataFrame, metrics: Iterable[str], counts: pd.Series, session_ids: Iterable[int]):
+        """Rebuild the sketches of session_ids from shots tagged with session_id and stroke_category.
+
+        counts maps every current session to its shot count; sessions no
+        longer present are dropped, and the store is marked current.
+        """
+        session_ids = [int(s) for s in session_ids]
+        shots = shots[shots['session_id'].isin(session_ids)]
+        rows = []
+        for (session_id, category), group in shots.groupby(['session_id', 'stroke_category'], observed=True):
+            for metric in metrics:
+                if metric not in group.columns:
+                    continue
+                values = group[metric].to_numpy(dtype=float)
+                hist = Histogram(self.config.SKETCH_BIN_WIDTHS[metric]).update(values)
+                digest = TDigest(self.config.SKETCH_COMPRESSION).update(values)
+                if digest.count == 0:
+                    continue
+                rows.append((int(session_id), category, metric,
+                             json.dumps(hist.to_dict()), json.dumps(digest.to_dict())))
+
+        current = {int(s) for s in counts.index}
+        with closing(self._connect()) as conn, conn:
+            if self._meta(conn, 'settings') != self.settings():
+                conn.execute("DELETE FROM shot_sketches")
+                conn.execute("DELETE FROM sketch_sessions")
+            stored = {s for (s,) in conn.execute("SELECT session_id FROM sketch_sessions")}
+            dropped = [(s,) for s in (stored - current) | set(session_ids)]
+            conn.executemany("DELETE FROM shot_sketches WHERE session_id = ?", dropped)
+            conn.executemany("DELETE FROM sketch_sessions WHERE session_id = ?", dropped)
+            conn.executemany("INSERT INTO shot_sketches VALUES (?, ?, ?, ?, ?)", rows)
+            conn.executemany("INSERT INTO sketch_sessions VALUES (?, ?)",
+                             [(s, int(counts[s])) for s in session_ids])
+            conn.executemany("INSERT OR REPLACE INTO sketch_meta VALUES (?, ?)",
+                             [('settings', self.settings()), ('source_version', self.source_version())])
+
+    def merged(self, session_ids: List[int], metric: str) -> Dict[str, Tuple[Histogram, TDigest]]:
+        """Merge the sketches of the given sessions into one (histogram, digest) per stroke category"""
+        if not session_ids:
+            return {}
+        placeholders = ','.join('?' * len(session_ids))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(
+                f"SELECT stroke_category, histogram_json, digest_json FROM shot_sketches "
+                f"WHERE metric = ? AND session_id IN ({placeholders})",
+                [metric, *[int(s) for s in session_ids]]
+            ).fetchall()
+
+        result = {}
+        for category, hist_json, digest_json in rows:
+            hist = Histogram.from_dict(json.loads(hist_json))
+            digest = TDigest.from_dict(json.loads(digest_json))
+            if category in result:
+                result[category][0].merge(hist)
+                result[category][1].merge(digest)
+            else:
+                result[category] = (hist, digest)
+        return result
@@ -0,0 +1,136 @@
+import json
+import os
+import sqlite3
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pyarrow as pa
+import pytest
+from api import ARROW_CONTENT_TYPE, QueryAPI, make_handler
+from config import Config
+from disk_cache import db_version
+
+
+def touch(path):
+    # Writes within one mtime tick would otherwise look unchanged
+    mtime = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def api(tmp_path):
+    path = tmp_path / 'playpop_.db'
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE tb_activities (_id INTEGER, local_id TEXT, start_time INTEGER, type TEXT,
+            piq_score REAL, max_piq_score REAL)
+    """)
+    conn.executemany("INSERT INTO tb_activities VALUES (?, ?, ?, 'RALLY', ?, ?)", [
+        (1, 'a1', 1_709_312_400_000, 5000, 6000),
+        (2, 'a2', 1_709_398_800_000, 5500, 7000),
+    ])
+    conn.commit()
+    conn.close()
+    return QueryAPI(Config(DB_PATH=path, SHOT_DB_PATH=tmp_path / 'BabPopExt.db', CACHE_DIR=tmp_path / 'cache'))
+
+
+@pytest.fixture
+def server(api):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(api))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def get(url, headers=None):
+    request = urllib.request.Request(url, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_request_key_keeps_only_used_parameters(api):
+    assert api.request_key('/sessions/', {'x': ['1']}, 'json') == (('sessions',), (), 'json')
+    key = api.request_key('/history', {'metric': ['piq_score, max_piq_score'], 'x': ['1']}, 'json')
+    assert key == (('history',), ('piq_score', 'max_piq_score'), 'json')
+    assert api.request_key('/history', {'metric': ['piq_score', 'max_piq_score']}, 'json') == key
+    assert api.request_key('/history', {}, 'json') == key
+
+
+def test_respond_caches_per_version_and_bounds_entries(api, monkeypatch):
+    queries = []
+    query = api._query
+    monkeypatch.setattr(api, '_query', lambda parts, metrics: queries.append(parts) or query(parts, metrics))
+    monkeypatch.setattr(api, 'MAX_CACHE_ENTRIES', 2)
+    sessions = api.request_key('/sessions', {}, 'json')
+    history = api.request_key('/history', {}, 'json')
+    arrow = api.request_key('/sessions', {}, 'arrow')
+
+    api.respond(sessions, 'v1')
+    api.respond(sessions, 'v1')
+    assert len(queries) == 1
+
+    # Touching sessions makes history the least recently used entry
+    api.respond(history, 'v1')
+    api.respond(sessions, 'v1')
+    api.respond(arrow, 'v1')
+    assert list(api._cache) == [sessions, arrow]
+
+    api.respond(sessions, 'v2')
+    assert len(queries) == 4
+    assert list(api._cache) == [sessions]
+
+
+def test_etag_and_not_modified(api, server):
+    status, headers, body = get(f"{server}/sessions")
+    assert status == 200
+    assert headers['Content-Type'] == 'application/json'
+    assert [row['_id'] for row in json.loads(body)] == [2, 1]
+    etag = headers['ETag']
+    assert get(f"{server}/sessions?unused=1")[1]['ETag'] == etag
+
+    status, headers, body = get(f"{server}/sessions", {'If-None-Match': etag})
+    assert (status, headers['ETag'], body) == (304, etag, b'')
+
+    with sqlite3.connect(api.config.DB_PATH) as conn:
+        conn.execute("DELETE FROM tb_activities WHERE _id = 2")
+    touch(api.config.DB_PATH)
+    status, headers, body = get(f"{server}/sessions", {'If-None-Match': etag})
+    assert status == 200
+    assert headers['ETag'] == api.etag(db_version(api.config), api.request_key('/sessions', {}, 'json'))
+    assert [row['_id'] for row in json.loads(body)] == [1]
+
+
+def test_arrow_format_selection(server):
+    for url, headers in [(f"{server}/history?format=arrow", {}),
+                         (f"{server}/history", {'Accept': ARROW_CONTENT_TYPE})]:
+        status, response_headers, body = get(url, headers)
+        assert status == 200
+        assert response_headers['Content-Type'] == ARROW_CONTENT_TYPE
+        table = pa.ipc.open_stream(body).read_all()
+        assert table.column_names == ['_id', 'datetime', 'piq_score', 'max_piq_score']
+        assert table.column('_id').to_pylist() == [1, 2]
+
+
+def test_error_bodies(api, server, monkeypatch):
+    status, headers, body = get(f"{server}/nope")
+    assert (status, json.loads(body)) == (404, {'error': 'Unknown resource: /nope'})
+    assert headers['Content-Type'] == 'application/json'
+
+    status, _, body = get(f"{server}/sessions/99/shots")
+    assert (status, json.loads(body)) == (404, {'error': 'Unknown session: 99'})
+
+    status, _, body = get(f"{server}/history?metric=type,bogus")
+    assert (status, json.loads(body)) == (400, {'error': 'Unknown metric(s): type, bogus'})
+
+    def fail():
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(api, 'sessions', fail)
+    status, _, body = get(f"{server}/sessions")
+    assert (status, json.loads(body)) == (500, {'error': 'RuntimeError: boom'})
+    assert api.request_key('/sessions', {}, 'json') not in api._cache
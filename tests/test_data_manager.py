@@ -0,0 +1,58 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from config import Config
+from data_manager import DataManager
+
+
+@pytest.fixture
+def light_config(tmp_path):
+    path = tmp_path / 'playpop_.db'
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE tb_light_motions (activity_id TEXT, motion_uuid TEXT, motion_type TEXT,
+            motion_time INTEGER, kpi1 TEXT, kpi2 TEXT, kpi3 TEXT, piqscore REAL)
+    """)
+    start = int(pd.Timestamp('2024-03-01 17:00', tz='UTC').timestamp() * 1000)
+    conn.executemany("INSERT INTO tb_light_motions VALUES (?, ?, ?, ?, ?, ?, ?, ?)", [
+        ('a1', 'm2', 'FOREHAND', start + 2000, '61.5', '22.25', 'LIFTED', 6100),
+        ('a1', 'm1', 'SERVE', start, '40', '30.5', 'FLAT', 5200),
+        ('a2', 'm3', 'BACKHAND', start + 60000, 'n/a', '', 'SLICED', 4300),
+        ('a3', 'm4', 'FOREHAND', start + 120000, '55', '20', 'FLAT', 5500),
+    ])
+    conn.commit()
+    conn.close()
+    return Config(DB_PATH=path, SHOT_SOURCE='light_motions', CACHE_DIR=tmp_path / 'cache')
+
+
+def test_load_light_motions_filters_activities(light_config):
+    df = DataManager.load_light_motions(light_config, ('a1', 'a2'))
+    assert df['motion_uuid'].tolist() == ['m1', 'm2', 'm3']
+    assert set(DataManager.load_light_motions(light_config, ('a3',))['activity_id']) == {'a3'}
+    assert len(DataManager.load_light_motions(light_config, None)) == 4
+    assert DataManager.load_light_motions(light_config, ('missing',)).empty
+
+
+def test_load_light_motions_parses_kpis(light_config):
+    df = DataManager.load_light_motions(light_config, None)
+    for column in ['EffectValue', 'SpeedValue', 'PIQ']:
+        assert df[column].dtype == np.float32
+    assert df['EffectValue'].tolist()[:2] == [40.0, 61.5]
+    assert df['SpeedValue'].tolist()[:2] == [30.5, 22.25]
+    # Unparseable kpi text becomes NaN instead of failing the load
+    assert df[['EffectValue', 'SpeedValue']].iloc[2].isna().all()
+    assert df['spin'].tolist() == ['FLAT', 'LIFTED', 'SLICED', 'FLAT']
+
+
+def test_load_light_motions_converts_to_naive_local_time(light_config):
+    df = DataManager.load_light_motions(light_config, ('a1',))
+    assert df['time'].dt.tz is None
+    assert df['time'].tolist() == [pd.Timestamp('2024-03-01 10:00:00'), pd.Timestamp('2024-03-01 10:00:02')]
+
+
+def test_parse_json_returns_empty_dict_for_bad_or_missing_json():
+    assert DataManager.parse_json('{bad') == {}
+    assert DataManager.parse_json(None) == {}
+    assert DataManager.parse_json('') == {}
+    assert DataManager.parse_json('{"FLAT": 3}') == {'FLAT': 3}
@@ -0,0 +1,117 @@
+import os
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from config import Config
+from disk_cache import DiskCache, disk_cached
+
+calls = []
+
+
+@disk_cached
+def count_loads(config: Config, value: int) -> pd.DataFrame:
+    calls.append(value)
+    return pd.DataFrame({'value': [value]})
+
+
+def touch(path):
+    # Writes within one mtime tick would otherwise look unchanged
+    mtime = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_key_ignores_display_and_registry_settings(tmp_path):
+    cache = DiskCache(tmp_path / 'cache', 1 << 20)
+    config = Config(DB_PATH=tmp_path / 'playpop_.db', SHOT_DB_PATH=tmp_path / 'BabPopExt.db')
+    key = cache.key('loader', config, (), {})
+
+    assert cache.key('loader', config.for_player('default'), (), {}) == key
+    config.PLOT_COLORS = {**config.PLOT_COLORS, 'avg_piq': '#000000'}
+    config.PLAYERS = {**config.PLAYERS, 'other': (Path('a.db'), Path('b.db'))}
+    config.SKETCH_COMPRESSION = 50
+    assert cache.key('loader', config, (), {}) == key
+
+
+def test_key_tracks_source_fields_and_arguments(tmp_path):
+    cache = DiskCache(tmp_path / 'cache', 1 << 20)
+    config = Config(DB_PATH=tmp_path / 'playpop_.db', SHOT_DB_PATH=tmp_path / 'BabPopExt.db')
+    key = cache.key('loader', config, (1,), {})
+
+    assert cache.key('loader', config, (2,), {}) != key
+    assert cache.key('other', config, (1,), {}) != key
+    assert cache.key('loader', Config(DB_PATH=tmp_path / 'x.db', SHOT_DB_PATH=config.SHOT_DB_PATH), (1,), {}) != key
+    config.TIMEZONE = 'UTC'
+    assert cache.key('loader', config, (1,), {}) != key
+
+
+def test_memory_fallback_without_cache_dir(tmp_path):
+    db = tmp_path / 'playpop_.db'
+    db.write_bytes(b'')
+    config = Config(DB_PATH=db, SHOT_DB_PATH=db, CACHE_DIR=None)
+    calls.clear()
+
+    assert count_loads(config, 1)['value'].tolist() == [1]
+    assert count_loads(config, 1)['value'].tolist() == [1]
+    assert calls == [1]
+    count_loads(config, 2)
+    assert calls == [1, 2]
+
+    touch(db)
+    count_loads(config, 1)
+    assert calls == [1, 2, 1]
+    assert not (tmp_path / '.cache').exists()
+
+
+def test_round_trip_preserves_types_and_index(tmp_path):
+    cache = DiskCache(tmp_path / 'cache', 1 << 20)
+    df = pd.DataFrame({
+        'datetime': pd.date_range('2024-03-01 10:00', periods=4, freq='h', tz='America/Phoenix'),
+        'time': pd.date_range('2024-03-01 10:00', periods=4, freq='s'),
+        'stroke_category': ['Serve', 'Forehand', None, 'Backhand'],
+        'PIQ': np.array([5000.0, np.nan, 6000.0, 7000.0], dtype=np.float32),
+        'session_id': np.arange(4, dtype=np.int64)
+    }, index=[3, 1, 2, 0]).sort_values('PIQ')
+
+    cache.put('entry', df)
+    restored = cache.get('entry')
+    pd.testing.assert_frame_equal(restored, df)
+    assert str(restored['datetime'].dt.tz) == 'America/Phoenix'
+
+
+def test_get_missing_or_corrupt_entry_returns_none(tmp_path):
+    cache = DiskCache(tmp_path / 'cache', 1 << 20)
+    assert cache.get('missing') is None
+    (tmp_path / 'cache' / f"corrupt{DiskCache.SUFFIX}").write_bytes(b'not arrow')
+    assert cache.get('corrupt') is None
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = DiskCache(tmp_path / 'cache', 1 << 30)
+    df = pd.DataFrame({'value': np.arange(1000, dtype=np.float64)})
+    for i, name in enumerate(['a', 'b']):
+        cache.put(name, df)
+        os.utime(cache._path(name), (1_000_000 + i, 1_000_000 + i))
+    size = cache._path('a').stat().st_size
+
+    # Reading 'a' makes 'b' the least recently used entry
+    assert cache.get('a') is not None
+    cache.max_bytes = 2 * size
+    cache.put('c', df)
+    assert sorted(p.stem for p in (tmp_path / 'cache').glob(f"*{DiskCache.SUFFIX}")) == ['a', 'c']
+
+
+def test_database_write_invalidates_entries(tmp_path):
+    db = tmp_path / 'playpop_.db'
+    db.write_bytes(b'')
+    config = Config(DB_PATH=db, SHOT_DB_PATH=db, CACHE_DIR=tmp_path / 'cache')
+    key = DiskCache.key('loader', config, (), {})
+    calls.clear()
+
+    count_loads(config, 1)
+    count_loads(config, 1)
+    assert calls == [1]
+
+    touch(db)
+    assert DiskCache.key('loader', config, (), {}) != key
+    count_loads(config, 1)
+    assert calls == [1, 1]
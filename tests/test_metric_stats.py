@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from metric_stats import MetricStats
+
+COLUMNS = ['PIQ', 'SpeedValue', 'EffectValue']
+
+
+@pytest.fixture
+def shots():
+    rng = np.random.default_rng(0)
+    speed = rng.normal(25, 5, 600)
+    return pd.DataFrame({
+        'PIQ': speed * 150 + rng.normal(0, 500, 600),
+        'SpeedValue': speed,
+        'EffectValue': rng.uniform(0, 100, 600),
+        'group': rng.integers(0, 4, 600)
+    })
+
+
+def test_merged_splits_match_describe_and_corr(shots):
+    parts = [MetricStats.from_frame(g, COLUMNS) for _, g in shots.groupby('group')]
+    stats = MetricStats.merge_all(parts, COLUMNS)
+
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    expected = shots[COLUMNS].describe()
+    assert list(stats.describe().index) == list(expected.index)
+    pd.testing.assert_frame_equal(stats.describe().loc[exact], expected.loc[exact])
+    pd.testing.assert_frame_equal(stats.corr(), shots[COLUMNS].corr())
+
+
+def test_merged_quartiles_match_np_quantile(shots):
+    parts = [MetricStats.from_frame(g, COLUMNS) for _, g in shots.groupby('group')]
+    quartiles = MetricStats.merge_all(parts, COLUMNS).describe().loc[['25%', '50%', '75%']]
+    for column in COLUMNS:
+        values = shots[column].to_numpy()
+        expected = np.quantile(values, MetricStats.QUARTILES)
+        np.testing.assert_allclose(quartiles[column], expected, atol=0.02 * values.std())
+
+
+def test_subset_merge_matches_filtered_frame(shots):
+    parts = {key: MetricStats.from_frame(g, COLUMNS) for key, g in shots.groupby('group')}
+    stats = MetricStats.merge_all((parts[k] for k in (1, 3)), COLUMNS)
+    subset = shots[shots['group'].isin([1, 3])][COLUMNS]
+    exact = ['count', 'mean', 'std', 'min', 'max']
+    np.testing.assert_allclose(stats.describe().loc[exact].to_numpy(), subset.describe().loc[exact].to_numpy())
+
+
+def test_rows_with_missing_values_are_skipped(shots):
+    shots.loc[:9, 'SpeedValue'] = np.nan
+    stats = MetricStats.from_frame(shots, COLUMNS)
+    assert stats.n == len(shots) - 10
+    np.testing.assert_allclose(stats.mean, shots[COLUMNS].dropna().mean().to_numpy())
+
+
+def test_merge_rejects_different_columns():
+    with pytest.raises(ValueError):
+        MetricStats(['PIQ']).merge(MetricStats(['SpeedValue']))
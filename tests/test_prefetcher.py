@@ -0,0 +1,57 @@
+import threading
+from prefetcher import SessionPrefetcher
+
+
+def test_finished_jobs_and_owners_are_forgotten():
+    prefetcher = SessionPrefetcher(max_workers=1)
+    release = threading.Event()
+    prefetcher.prefetch('closed-tab', {1: release.wait, 2: lambda: 'result'})
+    assert set(prefetcher._futures['closed-tab']) == {1, 2}
+
+    release.set()
+    prefetcher.executor.shutdown(wait=True)
+    assert prefetcher._futures == {}
+
+
+def test_replaced_jobs_are_cancelled_and_running_jobs_kept():
+    prefetcher = SessionPrefetcher(max_workers=1)
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait()
+
+    prefetcher.prefetch('tab', {1: blocking, 2: lambda: None})
+    started.wait()
+    running = prefetcher._futures['tab'][1]
+    queued = prefetcher._futures['tab'][2]
+
+    prefetcher.prefetch('tab', {1: blocking, 3: lambda: None})
+    assert queued.cancelled()
+    assert prefetcher._futures['tab'][1] is running
+    assert set(prefetcher._futures['tab']) == {1, 3}
+
+    release.set()
+    prefetcher.executor.shutdown(wait=True)
+    assert prefetcher._futures == {}
+
+
+def test_cancel_and_empty_requests_drop_owner():
+    prefetcher = SessionPrefetcher(max_workers=1)
+    release = threading.Event()
+    prefetcher.prefetch('tab', {1: release.wait, 2: lambda: None})
+    prefetcher.cancel('tab')
+    assert 'tab' not in prefetcher._futures
+
+    prefetcher.prefetch('other', {})
+    assert prefetcher._futures == {}
+    release.set()
+    prefetcher.executor.shutdown(wait=True)
+
+
+def test_quick_job_is_discarded():
+    prefetcher = SessionPrefetcher(max_workers=1)
+    prefetcher.prefetch('tab', {1: lambda: None})
+    prefetcher.executor.shutdown(wait=True)
+    assert prefetcher._futures == {}
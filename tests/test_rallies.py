@@ -0,0 +1,65 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from config import Config
+from rallies import load_rallies, segment_rallies
+
+
+def make_shots(seconds, counters=None, activities=None, piq=None):
+    shots = pd.DataFrame({
+        'time': pd.Timestamp('2024-05-01 10:00') + pd.to_timedelta(seconds, unit='s'),
+        'PIQ': piq if piq is not None else np.full(len(seconds), 5000.0)
+    })
+    if counters is not None:
+        shots['stroke_counter'] = counters
+    if activities is not None:
+        shots['activity_id'] = activities
+    return shots
+
+
+def test_breaks_on_time_gap():
+    rallies = segment_rallies(make_shots([0, 3, 6, 20, 22]), max_gap_seconds=8.0)
+    assert rallies['length'].tolist() == [3, 2]
+    assert rallies['duration'].tolist() == [6.0, 2.0]
+    assert rallies['start'].iloc[1] == pd.Timestamp('2024-05-01 10:00:20')
+
+
+def test_gap_equal_to_threshold_continues_rally():
+    rallies = segment_rallies(make_shots([0, 8, 16]), max_gap_seconds=8.0)
+    assert rallies['length'].tolist() == [3]
+
+
+def test_breaks_on_counter_reset():
+    rallies = segment_rallies(make_shots([0, 1, 2, 3, 4], counters=[5, 6, 7, 1, 2]), max_gap_seconds=8.0)
+    assert rallies['length'].tolist() == [3, 2]
+
+
+def test_breaks_on_repeated_counter():
+    rallies = segment_rallies(make_shots([0, 1, 2], counters=[1, 2, 2]), max_gap_seconds=8.0)
+    assert rallies['length'].tolist() == [2, 1]
+
+
+def test_breaks_on_activity_change():
+    rallies = segment_rallies(make_shots([0, 1, 2, 3], activities=[7, 7, 8, 8]), max_gap_seconds=8.0)
+    assert rallies['length'].tolist() == [2, 2]
+
+
+def test_mean_piq_ignores_missing_scores():
+    piq = np.array([4000.0, np.nan, 6000.0, np.nan])
+    rallies = segment_rallies(make_shots([0, 1, 2, 30], piq=piq), max_gap_seconds=8.0)
+    assert rallies['mean_piq'].iloc[0] == pytest.approx(5000.0)
+    assert np.isnan(rallies['mean_piq'].iloc[1])
+
+
+def test_empty_shots():
+    rallies = segment_rallies(make_shots([]), max_gap_seconds=8.0)
+    assert rallies.empty
+    assert list(rallies.columns) == ['start', 'length', 'duration', 'mean_piq']
+
+
+def test_load_rallies_does_not_create_missing_database(tmp_path):
+    config = Config(SHOT_DB_PATH=tmp_path / 'missing.db', CACHE_DIR=None)
+    with pytest.raises(sqlite3.OperationalError):
+        load_rallies(config, config.RALLY_MAX_GAP_SECONDS)
+    assert not (tmp_path / 'missing.db').exists()
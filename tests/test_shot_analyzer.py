@@ -0,0 +1,118 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+import wrangle
+from config import Config
+from shot_analyzer import ShotAnalyzer
+
+
+def make_sessions(starts):
+    return pd.DataFrame({
+        '_id': np.arange(1, len(starts) + 1),
+        'local_id': [f"act{i}" for i in range(1, len(starts) + 1)],
+        'datetime': pd.to_datetime(starts).tz_localize('UTC').tz_convert('America/Phoenix')
+    })
+
+
+@pytest.fixture
+def motions_db(tmp_path):
+    path = tmp_path / 'BabPopExt.db'
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE motions (time INTEGER, type TEXT, spin TEXT,
+            StyleScore REAL, StyleValue REAL, EffectScore REAL, EffectValue REAL,
+            SpeedScore REAL, SpeedValue REAL, stroke_counter INTEGER)
+    """)
+    rng = np.random.default_rng(0)
+    base = pd.Timestamp('2024-03-01 10:00', tz='UTC').timestamp()
+    # Shots spread over 10 hours, so some fall between or outside sessions
+    times = np.sort(base + rng.uniform(-3600, 36000, 500))
+    conn.executemany(
+        "INSERT INTO motions VALUES (?, 'FOREHAND', 'FLAT', 1, 1, 2, 2, 3, 3, ?)",
+        [(int(t * 10000), i) for i, t in enumerate(times)]
+    )
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def light_db(tmp_path):
+    path = tmp_path / 'playpop_.db'
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE tb_light_motions (activity_id TEXT, motion_uuid TEXT, motion_type TEXT,
+            motion_time INTEGER, kpi1 TEXT, kpi2 TEXT, kpi3 TEXT, piqscore REAL)
+    """)
+    conn.commit()
+    conn.close()
+    return path
+
+
+def add_light_shots(path, activity_id, count, start_ms):
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO tb_light_motions VALUES (?, ?, 'FOREHAND', ?, '50', '20', 'FLAT', ?)",
+            [(activity_id, f"{activity_id}-{start_ms + i}", start_ms + i * 1000, 5000 + i) for i in range(count)]
+        )
+    # Writes within one mtime tick would otherwise look unchanged
+    mtime = os.stat(path).st_mtime_ns + 1_000_000_000
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_session_shot_counts_match_assign_sessions(motions_db):
+    sessions = make_sessions(['2024-03-01 10:00', '2024-03-01 11:30', '2024-03-01 16:00'])
+    config = Config(SHOT_DB_PATH=motions_db)
+
+    counts = ShotAnalyzer.session_shot_counts(config, sessions)
+    tagged = ShotAnalyzer.assign_sessions(wrangle.wrangle(motions_db), sessions)
+    expected = tagged['session_id'].value_counts().reindex(sessions['_id'], fill_value=0)
+    assert counts.sort_index().tolist() == expected.sort_index().tolist()
+    assert counts.sum() < 500
+
+
+def test_build_sketches_only_loads_changed_sessions(light_db, tmp_path, monkeypatch):
+    config = Config(DB_PATH=light_db, SKETCH_DB_PATH=tmp_path / 'sketches.db', SHOT_SOURCE='light_motions',
+                    CACHE_DIR=tmp_path / 'cache')
+    sessions = make_sessions(['2024-03-01 10:00', '2024-03-02 10:00'])
+    add_light_shots(light_db, 'act1', 3, 1_709_287_200_000)
+    add_light_shots(light_db, 'act2', 4, 1_709_373_600_000)
+
+    loads = []
+    load_tagged_shots = ShotAnalyzer.load_tagged_shots
+
+    def recording_load(*args, **kwargs):
+        loads.append(kwargs.get('session_ids'))
+        return load_tagged_shots(*args, **kwargs)
+
+    monkeypatch.setattr(ShotAnalyzer, 'load_tagged_shots', staticmethod(recording_load))
+
+    store = ShotAnalyzer.build_sketches(config, sessions)
+    assert loads == [[1, 2]]
+    assert store.merged([1, 2], 'PIQ')['Forehand'][1].count == 7
+
+    # Unchanged databases are not read again
+    ShotAnalyzer.build_sketches(config, sessions)
+    assert len(loads) == 1
+
+    add_light_shots(light_db, 'act2', 2, 1_709_373_700_000)
+    store = ShotAnalyzer.build_sketches(config, sessions)
+    assert loads[-1] == [2]
+    assert store.merged([2], 'PIQ')['Forehand'][1].count == 6
+    assert store.merged([1], 'PIQ')['Forehand'][1].count == 3
+
+
+def test_build_sketches_skips_update_while_locked(light_db, tmp_path):
+    config = Config(DB_PATH=light_db, SKETCH_DB_PATH=tmp_path / 'sketches.db', SHOT_SOURCE='light_motions',
+                    CACHE_DIR=tmp_path / 'cache')
+    sessions = make_sessions(['2024-03-01 10:00'])
+    add_light_shots(light_db, 'act1', 3, 1_709_287_200_000)
+
+    store = ShotAnalyzer.build_sketches(config, sessions)
+    with store.lock() as acquired:
+        assert acquired
+        add_light_shots(light_db, 'act1', 1, 1_709_287_300_000)
+        assert ShotAnalyzer.build_sketches(config, sessions).merged([1], 'PIQ')['Forehand'][1].count == 3
+    assert ShotAnalyzer.build_sketches(config, sessions).merged([1], 'PIQ')['Forehand'][1].count == 4
@@ -0,0 +1,125 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from config import Config
+from sketches import Histogram, SketchStore, TDigest
+
+QUANTILES = [0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+
+def test_histogram_merge_matches_single_pass():
+    rng = np.random.default_rng(0)
+    parts = [rng.normal(5000, 1500, 1000) for _ in range(5)]
+    merged = Histogram(100)
+    for part in parts:
+        merged.merge(Histogram(100).update(part))
+
+    direct = Histogram(100).update(np.concatenate(parts))
+    assert merged.counts == direct.counts
+    assert merged.count == 5000
+
+
+def test_histogram_bins_and_round_trip():
+    hist = Histogram(0.5).update([0.1, 0.4, 0.6, -0.2, np.nan])
+    frame = hist.to_frame()
+    assert frame['bin_start'].tolist() == [-0.5, 0.0, 0.5]
+    assert frame['count'].tolist() == [1, 2, 1]
+    assert Histogram.from_dict(json.loads(json.dumps(hist.to_dict()))).counts == hist.counts
+
+
+def test_histogram_rejects_different_bin_widths():
+    with pytest.raises(ValueError):
+        Histogram(1).merge(Histogram(2))
+
+
+def test_tdigest_merged_quantiles_match_numpy():
+    rng = np.random.default_rng(1)
+    parts = [rng.gamma(2, 1000, 3000) for _ in range(20)]
+    digest = TDigest(100)
+    for part in parts:
+        digest.merge(TDigest(100).update(part))
+
+    values = np.concatenate(parts)
+    assert digest.count == values.size
+    assert len(digest.means) <= 100
+    expected = np.quantile(values, QUANTILES)
+    spread = np.quantile(values, 0.99) - np.quantile(values, 0.01)
+    np.testing.assert_allclose(digest.quantile(QUANTILES), expected, atol=0.02 * spread)
+    assert digest.quantile(0) == values.min()
+    assert digest.quantile(1) == values.max()
+
+
+def test_tdigest_round_trip_and_empty():
+    digest = TDigest(50).update(np.arange(1000))
+    restored = TDigest.from_dict(json.loads(json.dumps(digest.to_dict())))
+    np.testing.assert_allclose(restored.quantile(QUANTILES), digest.quantile(QUANTILES))
+    assert np.isnan(TDigest().quantile(0.5))
+
+
+def test_sketch_store_merges_sessions_and_tracks_settings(tmp_path):
+    db = tmp_path / 'playpop_.db'
+    db.write_bytes(b'')
+    config = Config(DB_PATH=db, SKETCH_DB_PATH=tmp_path / 'sketches.db', SHOT_SOURCE='light_motions')
+    store = SketchStore(config)
+    assert store.is_stale()
+
+    shots = pd.DataFrame({
+        'session_id': [1, 1, 2, 2],
+        'stroke_category': ['Serve', 'Serve', 'Serve', 'Forehand'],
+        'PIQ': [1000.0, 2000.0, 3000.0, 4000.0]
+    })
+    counts = pd.Series({1: 2, 2: 2})
+    assert store.stale_sessions(counts) == [1, 2]
+    store.update(shots, ['PIQ'], counts, [1, 2])
+    assert not store.is_stale()
+    assert store.stale_sessions(counts) == []
+
+    merged = store.merged([1, 2], 'PIQ')
+    assert merged['Serve'][0].count == 3
+    assert merged['Serve'][1].quantile(1) == 3000.0
+    assert set(store.merged([1], 'PIQ')) == {'Serve'}
+
+    config.SKETCH_COMPRESSION = 50
+    assert store.is_stale()
+    assert store.stale_sessions(counts) == [1, 2]
+
+
+def test_sketch_store_updates_only_given_sessions(tmp_path):
+    db = tmp_path / 'playpop_.db'
+    db.write_bytes(b'')
+    config = Config(DB_PATH=db, SKETCH_DB_PATH=tmp_path / 'sketches.db', SHOT_SOURCE='light_motions')
+    store = SketchStore(config)
+    shots = pd.DataFrame({'session_id': [1, 2], 'stroke_category': ['Serve', 'Serve'], 'PIQ': [1000.0, 2000.0]})
+    store.update(shots, ['PIQ'], pd.Series({1: 1, 2: 1}), [1, 2])
+
+    # Session 2 gained a shot, session 3 is new and session 1 is unchanged
+    counts = pd.Series({1: 1, 2: 2, 3: 1})
+    assert store.stale_sessions(counts) == [2, 3]
+    shots = pd.DataFrame({'session_id': [2, 2, 3], 'stroke_category': ['Serve'] * 3, 'PIQ': [2000.0, 2500.0, 4000.0]})
+    store.update(shots, ['PIQ'], counts, [2, 3])
+    assert store.stale_sessions(counts) == []
+    assert store.merged([1, 2, 3], 'PIQ')['Serve'][0].count == 4
+
+    # Sessions missing from counts are dropped
+    store.update(shots.iloc[:0], ['PIQ'], pd.Series({2: 2, 3: 1}), [])
+    assert store.merged([1], 'PIQ') == {}
+
+
+def test_sketch_store_lock_is_single_writer(tmp_path):
+    config = Config(SKETCH_DB_PATH=tmp_path / 'sketches.db')
+    with SketchStore(config).lock() as first:
+        with SketchStore(config).lock() as second:
+            assert first and not second
+    with SketchStore(config).lock() as again:
+        assert again
+
+
+def test_sketch_store_lock_expires(tmp_path, monkeypatch):
+    config = Config(SKETCH_DB_PATH=tmp_path / 'sketches.db')
+    store = SketchStore(config)
+    with store.lock() as first:
+        assert first
+        monkeypatch.setattr(SketchStore, 'LOCK_TIMEOUT_SECONDS', -1)
+        with store.lock() as second:
+            assert second
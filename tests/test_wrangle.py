@@ -0,0 +1,55 @@
+import sqlite3
+import pandas as pd
+import pytest
+import wrangle
+
+@pytest.fixture
+def shot_db(tmp_path):
+    path = tmp_path / 'BabPopExt.db'
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE motions (time INTEGER, type TEXT, spin TEXT,
+            StyleScore REAL, StyleValue REAL, EffectScore REAL, EffectValue REAL,
+            SpeedScore REAL, SpeedValue REAL, stroke_counter INTEGER)
+    """)
+    start = pd.Timestamp('2024-03-01 10:00', tz='UTC')
+    rows = [
+        ('SERVE', 'UNSPECIFIED'), ('FOREHAND', 'LIFTED'), ('FOREHAND', 'SLICED'),
+        ('BACKHAND', 'FLAT'), ('BACKHAND', 'UNSPECIFIED'), ('VOLLEY', 'FLAT')
+    ]
+    conn.executemany(
+        "INSERT INTO motions VALUES (?, ?, ?, 1, 1, 2, 2, 3, 3, ?)",
+        [(int((start.timestamp() + i * 5) * 10000), t, s, i) for i, (t, s) in enumerate(rows)]
+    )
+    conn.commit()
+    conn.close()
+    return path, start
+
+
+def test_wrangle_maps_strokes(shot_db):
+    path, _ = shot_db
+    df = wrangle.wrangle(path)
+    assert df['stroke'].tolist() == ['SERVEFH', 'TOPSPINFH', 'SLICEFH', 'FLATBH', 'FLATBH', 'FLATFH']
+    assert (df['PIQ'] == 6).all()
+
+
+def test_wrangle_window_filters_rows(shot_db):
+    path, start = shot_db
+    df = wrangle.wrangle(path, [(start, start + pd.Timedelta(seconds=7))])
+    assert df['stroke'].tolist() == ['SERVEFH', 'TOPSPINFH']
+
+
+def test_wrangle_empty_window(shot_db):
+    path, start = shot_db
+    df = wrangle.wrangle(path, [(start + pd.Timedelta(days=1), start + pd.Timedelta(days=2))])
+    assert df.empty
+    assert 'stroke' in df.columns
+
+
+def test_wrangle_many_windows(shot_db):
+    path, start = shot_db
+    # Far more windows than SQLite allows OR terms in one expression
+    windows = [(start + pd.Timedelta(days=d), start + pd.Timedelta(days=d, seconds=1)) for d in range(1, 2000)]
+    windows.append((start + pd.Timedelta(seconds=4), start + pd.Timedelta(seconds=11)))
+    df = wrangle.wrangle(path, windows)
+    assert df['stroke'].tolist() == ['TOPSPINFH', 'SLICEFH']
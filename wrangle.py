@@ -1,12 +1,14 @@
 import sqlite3
+from pathlib import Path
+import numpy as np
 import pandas as pd
 import pytz
 from icecream import ic
 
 # Build your `wrangle` function here
-def wrangle(db_path):
-    # Connect to database
-    conn = sqlite3.connect(db_path)
+def wrangle(db_path, time_ranges=None):
+    # Connect read-only so a missing database is an error, not a new empty file
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
 
     # Construct query
     query = """
@@ -18,6 +20,19 @@ def wrangle(db_path):
     FROM motions
     """
 
+    # Optionally restrict to (start, end) windows of tz-aware timestamps;
+    # motion times are stored in 1/10000 s units. Windows go into a temp
+    # table so any number of them fits in one query
+    if time_ranges:
+        conn.execute("CREATE TEMP TABLE windows (start INTEGER, end INTEGER)")
+        conn.executemany(
+            "INSERT INTO windows VALUES (?, ?)",
+            [(int(start.timestamp() * 10000), int(end.timestamp() * 10000)) for start, end in time_ranges]
+        )
+        query += """
+    WHERE EXISTS (SELECT 1 FROM windows w WHERE motions.time BETWEEN w.start AND w.end)
+    """
+
     # Read query results into DataFrame
     # df = pd.read_sql(query, conn, index_col="time")
     df = pd.read_sql(query, conn)
@@ -39,9 +54,9 @@ def wrangle(db_path):
     df["time"] = pd.to_datetime(df["time"])
 
     # Create consistent stroke field for Babolat data
-    def map_bab_stroke(row):
-        stroke_type = row['type'].upper() if 'type' in row else ''
-        spin = row['spin'].upper() if 'spin' in row else ''
+    def map_bab_stroke(stroke_type, spin):
+        stroke_type = str(stroke_type).upper()
+        spin = str(spin).upper()
         
         if stroke_type == 'SERVE':
             return 'SERVEFH'
@@ -66,9 +81,12 @@ def wrangle(db_path):
         else:
             return 'FLATFH'  # Default case
     
-    # Add stroke field to Babolat data
+    # Add stroke field to Babolat data, mapping each distinct (type, spin) pair once
     if 'type' in df.columns:
-        df['stroke'] = df.apply(map_bab_stroke, axis=1)
+        keys = pd.MultiIndex.from_frame(df[['type', 'spin']])
+        pairs = keys.unique()
+        strokes = np.array([map_bab_stroke(t, s) for t, s in pairs], dtype=object)
+        df['stroke'] = strokes[pairs.get_indexer(keys)]
     
     conn.close()
     